@@ -0,0 +1,75 @@
+"""
+Load benchmark: sync chain.invoke on Starlette's threadpool vs. the routed async path /ask uses.
+
+Uses a local fake LLM with a fixed latency so no API keys or network are needed:
+
+    python bench_async.py --requests 300 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("GROQ_KEY", "bench")
+os.environ.setdefault("DATABASE_URL_ONLINE", "sqlite://")
+
+import anyio
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda
+
+import llm_chain
+from llm_chain import prompt_with_history, format_chat_history, invoke_routed
+
+HISTORY = [{"question": f"question {i}", "answer": f"answer {i}"} for i in range(10)]
+
+
+def build_fake_chain(latency: float):
+    def fake_llm(_prompt):
+        time.sleep(latency)
+        return AIMessage(content="fake answer")
+
+    async def afake_llm(_prompt):
+        await asyncio.sleep(latency)
+        return AIMessage(content="fake answer")
+
+    return prompt_with_history | RunnableLambda(fake_llm, afunc=afake_llm) | StrOutputParser()
+
+
+async def run_sync_mode(chain, requests: int):
+    # Same limiter a sync `def` route gets: anyio's default 40-thread pool
+    data = {"question": "hello", "chat_history": format_chat_history(HISTORY)}
+
+    async with anyio.create_task_group() as tg:
+        for _ in range(requests):
+            tg.start_soon(anyio.to_thread.run_sync, chain.invoke, data)
+
+
+async def run_async_mode(chain, requests: int):
+    # Serve every engine from the fake chain; no fallbacks, so nothing else is ever built
+    llm_chain.provider_router._get_chain = lambda engine: chain
+    llm_chain.provider_router.fallbacks = []
+    await asyncio.gather(*(invoke_routed("fake", "hello", HISTORY) for _ in range(requests)))
+
+
+async def main(requests: int, latency: float):
+    chain = build_fake_chain(latency)
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    print(f"{requests} concurrent requests, fake LLM latency {latency}s, threadpool size {limiter.total_tokens:.0f}")
+
+    for name, runner in [("sync (threadpool)", run_sync_mode), ("async (event loop)", run_async_mode)]:
+        started = time.perf_counter()
+        await runner(chain, requests)
+        elapsed = time.perf_counter() - started
+        print(f"{name:<20} {elapsed:7.2f}s  {requests / elapsed:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.latency))
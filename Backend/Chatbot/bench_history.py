@@ -0,0 +1,90 @@
+"""
+History window benchmark: full per-user load + Python slice vs. indexed ORDER BY DESC ... LIMIT.
+
+Seeds a local SQLite database with up to 100k chats for one user and times both
+queries as the history grows:
+
+    python bench_history.py --rows 100000 --window 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+db_path = os.path.join(tempfile.mkdtemp(), "bench_history.db")
+os.environ["DATABASE_URL_ONLINE"] = f"sqlite:///{db_path}"
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from database import Base, engine
+from models import User, ChatHistory
+
+USER_ID = 1
+
+
+def seed(session: Session, start: int, stop: int):
+    base_time = datetime(2024, 1, 1)
+    session.execute(insert(ChatHistory), [
+        {
+            "user_id": USER_ID,
+            "question": f"question {i}",
+            "answer": f"answer {i} " * 20,
+            "created_at": base_time + timedelta(seconds=i),
+        }
+        for i in range(start, stop)
+    ])
+    session.commit()
+
+
+def full_load(session: Session, window: int):
+    records = session.scalars(
+        select(ChatHistory)
+        .where(ChatHistory.user_id == USER_ID)
+        .order_by(ChatHistory.created_at.asc())
+    ).all()
+    return records[-window:]
+
+
+def windowed(session: Session, window: int):
+    return list(reversed(session.scalars(ChatHistory.recent_for_user(USER_ID, window)).all()))
+
+
+def timed(fn, session: Session, window: int, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        session.expunge_all()
+        started = time.perf_counter()
+        fn(session, window)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main(rows: int, window: int):
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        session.add(User(id=USER_ID, username="bench", hashed_password="x"))
+        session.commit()
+
+        print(f"{'rows':>8}  {'full load (ms)':>15}  {'windowed (ms)':>14}")
+        seeded = 0
+        for size in (1_000, 10_000, 50_000, rows):
+            if size > rows or size <= seeded:
+                continue
+            seed(session, seeded, size)
+            seeded = size
+            assert [c.id for c in full_load(session, window)] == [c.id for c in windowed(session, window)]
+            print(f"{size:>8}  {timed(full_load, session, window):>15.2f}  {timed(windowed, session, window):>14.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--window", type=int, default=10)
+    args = parser.parse_args()
+    main(args.rows, args.window)
@@ -0,0 +1,80 @@
+import os
+import threading
+from typing import Callable, Dict, Hashable, Iterable, Tuple
+
+import httpx
+
+# Pool sizes for the HTTP clients shared by every cached LLM client
+HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))
+HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "60"))
+
+
+class ChainRegistry:
+    """
+    Process-wide cache of LLM chains keyed by engine name and model params.
+
+    Chains are built once by `factory(engine, http_client, http_async_client, **params)`
+    and reused by every request, so provider clients keep their connection pools.
+    Lookups are lock-free once a chain exists; construction is serialized so
+    concurrent first requests for the same key build it only once.
+    """
+
+    def __init__(self, factory: Callable):
+        self._factory = factory
+        self._chains: Dict[Tuple[str, Tuple], object] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        limits = httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE)
+        self.http_client = httpx.Client(limits=limits, timeout=HTTP_TIMEOUT)
+        self.http_async_client = httpx.AsyncClient(limits=limits, timeout=HTTP_TIMEOUT)
+
+    @staticmethod
+    def _key(engine: str, params: Dict[str, Hashable]) -> Tuple[str, Tuple]:
+        return engine, tuple(sorted(params.items()))
+
+    def get(self, engine: str, **params):
+        key = self._key(engine, params)
+        chain = self._chains.get(key)
+        if chain is not None:
+            with self._lock:
+                self._hits += 1
+            return chain
+
+        with self._lock:
+            chain = self._chains.get(key)
+            if chain is not None:
+                self._hits += 1
+                return chain
+            self._misses += 1
+            chain = self._factory(engine, self.http_client, self.http_async_client, **params)
+            self._chains[key] = chain
+            return chain
+
+    def warm_up(self, engines: Iterable[str]) -> Dict[str, str]:
+        """Build chains ahead of the first request; failures are reported, not raised."""
+        status = {}
+        for engine in engines:
+            try:
+                self.get(engine)
+                status[engine] = "ready"
+            except Exception as e:
+                status[engine] = f"failed: {e}"
+        return status
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "chains": len(self._chains),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / total, 4) if total else 0.0,
+            }
+
+    async def aclose(self):
+        with self._lock:
+            self._chains.clear()
+        self.http_client.close()
+        await self.http_async_client.aclose()
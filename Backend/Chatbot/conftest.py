@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Make the shared Backend/common package importable when run from this directory
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+# The engines are built at import time, so point them at a scratch SQLite file first
+os.environ["DATABASE_URL_ONLINE"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'chatbot_test.db')}"
+os.environ.pop("DATABASE_URL_REPLICA", None)
+os.environ.setdefault("GROQ_KEY", "test")
+os.environ.setdefault("GEMINI_KEY", "test")
+os.environ["WARM_ENGINES"] = ""
+
+import itertools
+
+import pytest
+
+# Manual script that calls the real providers at import time
+collect_ignore = ["test_chain.py"]
+
+_usernames = (f"user{n}" for n in itertools.count())
+
+
+@pytest.fixture(scope="session")
+def tables():
+    from database import Base, engine
+    import models  # noqa: F401  (registers the chat tables)
+
+    Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture(scope="session")
+def client(tables):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    # Entered so every request shares one event loop, which the async engine's pool needs
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def user_id(tables):
+    from database import SessionLocal
+    from models import User
+
+    with SessionLocal() as db:
+        user = User(username=next(_usernames), hashed_password="-")
+        db.add(user)
+        db.commit()
+        return user.id
+
+
+@pytest.fixture
+def add_chats():
+    from database import SessionLocal
+    from models import ChatHistory
+
+    def add(user_id: int, turns, created_at=None):
+        """Save (question, answer) turns in order; returns their ids."""
+        with SessionLocal() as db:
+            extra = {"created_at": created_at} if created_at else {}
+            chats = [ChatHistory(user_id=user_id, question=q, answer=a, **extra) for q, a in turns]
+            db.add_all(chats)
+            db.commit()
+            return [chat.id for chat in chats]
+
+    return add
@@ -1,10 +1,23 @@
+import sys
+from pathlib import Path
+
+# Make the shared Backend/common package importable when run from this directory
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from common.db import Base, create_db_engine, create_async_db_engine, replica_url
 
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL_ONLINE")
-engine = create_engine(DATABASE_URL,pool_pre_ping=True)
+engine = create_db_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+async_engine = create_async_db_engine(DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# History listing/export/count read from DATABASE_URL_REPLICA when one is configured
+REPLICA_URL = replica_url()
+async_read_engine = create_async_db_engine(REPLICA_URL) if REPLICA_URL else async_engine
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
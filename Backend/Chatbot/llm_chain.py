@@ -1,3 +1,9 @@
+import sys
+from pathlib import Path
+
+# Make the shared Backend/common package importable when run from this directory
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
 import os
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
@@ -5,10 +11,14 @@ from langchain_core.output_parsers import StrOutputParser
 from langchain_groq import ChatGroq
 from langchain_ollama import ChatOllama
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage, AIMessage
-from typing import List, Dict
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from chain_registry import ChainRegistry
+from provider_router import ProviderRouter
+from common.log import get_logger
 
 load_dotenv()
+logger = get_logger(__name__)
 
 groq_key = os.getenv("GROQ_KEY")
 os.environ["GROQ_API_KEY"] = groq_key
@@ -31,6 +41,14 @@ prompt_with_history = ChatPromptTemplate.from_messages([
     ("human", "{question}")
 ])
 
+# Folds older turns into the stored rolling summary
+summary_prompt = ChatPromptTemplate.from_messages([
+    ("system", """You maintain a running summary of a conversation between a user and an AI assistant.
+    Update the existing summary with the new exchanges. Keep names, facts, preferences and open
+    questions; drop small talk. Reply with the updated summary only, in under 250 words."""),
+    ("human", "Existing summary:\n{summary}\n\nNew exchanges:\n{turns}")
+])
+
 # Simple prompt without history (fallback)
 simple_prompt = ChatPromptTemplate.from_messages([
     ("system", "You are a helpful assistant. Please respond carefully and thoughtfully."),
@@ -38,107 +56,115 @@ simple_prompt = ChatPromptTemplate.from_messages([
 ])
 
 
-def format_chat_history(chat_history: List[Dict]) -> List:
+def format_chat_history(chat_history: List[Dict], summary: str = "") -> List:
     """
     Convert chat history from database format to LangChain message format.
 
     Args:
         chat_history: List of chat records with 'question' and 'answer' keys
+        summary: Rolling summary of the turns older than chat_history, if any
 
     Returns:
         List of LangChain message objects in chronological order
     """
     messages = []
+    if summary:
+        messages.append(SystemMessage(content=f"Summary of our earlier conversation:\n{summary}"))
 
-    print(f"🔍 Formatting {len(chat_history)} chat history entries")
-
-    for i, chat in enumerate(chat_history):
+    for chat in chat_history:
         if chat.get('question'):
             messages.append(HumanMessage(content=chat['question']))
-            print(f"  📝 Human[{i}]: {chat['question'][:50]}...")
         if chat.get('answer'):
             messages.append(AIMessage(content=chat['answer']))
-            print(f"  🤖 AI[{i}]: {chat['answer'][:50]}...")
 
-    print(f"✅ Formatted {len(messages)} total messages")
+    logger.debug("Formatted %d history entries into %d messages", len(chat_history), len(messages))
     return messages
 
 
-def get_chain_with_history(engine: str):
+GROQ_ENGINES = ["llama-3.1-8b-instant", "llama-3.3-70b-versatile"]
+GEMINI_ENGINES = ["gemini-2.5-flash-lite"]
+OLLAMA_ENGINES = ["llama3.2:latest", "gemma3:1b"]
+SUPPORTED_ENGINES = GROQ_ENGINES + GEMINI_ENGINES + OLLAMA_ENGINES
+
+
+PROMPTS = {"history": prompt_with_history, "summary": summary_prompt}
+
+
+def build_chain(engine: str, http_client=None, http_async_client=None, prompt: str = "history", **params):
     """
-    Create a chain that can handle conversation history.
+    Create a chain that can handle conversation history (or, with prompt="summary",
+    one that folds turns into the rolling summary).
+
+    Groq clients reuse the registry's pooled HTTP clients; Gemini and Ollama keep
+    their own transport, which is reused as long as the chain stays cached.
     """
     try:
         # Initialize the appropriate LLM
-        if engine in ["llama-3.1-8b-instant", "llama-3.3-70b-versatile"]:
-            llm = ChatGroq(model=engine, streaming=True)
-        elif engine in ["gemini-2.5-flash-lite"]:
-            llm = ChatGoogleGenerativeAI(model=engine, google_api_key=gemini_api_key)
-        elif engine in ["llama3.2:latest", "gemma3:1b"]:
-            llm = ChatOllama(model=engine)
+        if engine in GROQ_ENGINES:
+            llm = ChatGroq(model=engine, streaming=True, http_client=http_client,
+                           http_async_client=http_async_client, **params)
+        elif engine in GEMINI_ENGINES:
+            llm = ChatGoogleGenerativeAI(model=engine, google_api_key=gemini_api_key, **params)
+        elif engine in OLLAMA_ENGINES:
+            llm = ChatOllama(model=engine, **params)
         else:
-            print(f"❌ No match found for engine: '{engine}'")
             raise ValueError(f"Unknown engine: '{engine}'.")
 
         # Create chain with history support
         output_parser = StrOutputParser()
-        chain = prompt_with_history | llm | output_parser
+        chain = PROMPTS[prompt] | llm | output_parser
 
-        print(f"✅ History-aware chain created successfully for {engine}")
+        logger.info("Chain created", extra={"engine": engine, "prompt": prompt})
         return chain
 
     except ImportError as e:
-        print(f"❌ Import error for {engine}: {e}")
+        logger.error("Import error for %s: %s", engine, e)
         raise ImportError(f"Required library not installed for {engine}: {e}")
     except Exception as e:
-        print(f"❌ Chain creation error for {engine}: {e}")
+        logger.error("Chain creation error for %s: %s", engine, e)
         raise Exception(f"Failed to create chain for {engine}: {e}")
 
 
+chain_registry = ChainRegistry(build_chain)
 
-def invoke_with_history(chain, question: str, chat_history: List[Dict]) -> str:
-    """
-    Invoke the chain with conversation history.
-
-    Args:
-        chain: The LangChain chain object
-        question: Current user question
-        chat_history: List of previous chat exchanges (in chronological order)
 
-    Returns:
-        AI response string
+def get_chain_with_history(engine: str, **params):
     """
-    try:
-        print(f"🚀 Invoking chain with question: {question[:100]}...")
-        print(f"📚 Using {len(chat_history)} previous exchanges for context")
-
-        # Format chat history for the chain
-        formatted_history = format_chat_history(chat_history)
-
-        print(f"🔗 Total formatted messages: {len(formatted_history)}")
+    Return the shared history-aware chain for an engine and model params,
+    building it on first use.
+    """
+    return chain_registry.get(engine, **params)
 
-        # Build the complete conversation context
-        conversation_data = {
-            "question": question,
-            "chat_history": formatted_history
-        }
 
-        print(f"💭 Sending to AI with full context...")
+def get_summary_chain(engine: str):
+    """Return the shared chain that updates a rolling conversation summary."""
+    return chain_registry.get(engine, prompt="summary")
 
-        # Invoke the chain with history
-        response = chain.invoke(conversation_data)
 
-        print(f"✅ Received response: {response[:100]}...")
-        return response
+provider_router = ProviderRouter(get_chain_with_history)
 
-    except Exception as e:
-        print(f"❌ Error invoking chain with history: {e}")
-        print(f"🔍 Error details: {str(e)}")
 
-        # Fallback to simple invocation without history
-        try:
-            print("⚠️ Falling back to simple chain without history...")
+async def invoke_routed(engine: str, question: str, chat_history: List[Dict], summary: str = "",
+                        hedge: Optional[bool] = None, fallback: bool = True) -> Tuple[str, str]:
+    """
+    Answer through the provider router (fallback, circuit breakers, optional hedging).
 
-        except Exception as fallback_error:
-            print(f"❌ Fallback also failed: {fallback_error}")
-            raise e
\ No newline at end of file
+    Returns:
+        (engine that served the answer, AI response string)
+    """
+    conversation_data = {
+        "question": question,
+        "chat_history": format_chat_history(chat_history, summary)
+    }
+    return await provider_router.invoke(engine, conversation_data, hedge, fallback)
+
+
+async def stream_routed(engine: str, question: str, chat_history: List[Dict], summary: str = "",
+                        hedge: Optional[bool] = None, fallback: bool = True) -> AsyncIterator[Tuple[str, str]]:
+    """Streaming counterpart of invoke_routed, yielding (serving engine, chunk) pairs."""
+    conversation_data = {
+        "question": question,
+        "chat_history": format_chat_history(chat_history, summary)
+    }
+    async for served_by, chunk in provider_router.stream(engine, conversation_data, hedge, fallback):
+        yield served_by, chunk
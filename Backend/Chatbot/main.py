@@ -1,57 +1,89 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import sys
+from pathlib import Path
+
+# Make the shared Backend/common package importable when run from this directory
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi import FastAPI, Depends, HTTPException, status, BackgroundTasks, Query, Response
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sse_starlette.sse import EventSourceResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from database import SessionLocal, Base, engine
-from models import User, ChatHistory
-from llm_chain import get_chain_with_history, invoke_with_history
+from sqlalchemy import select, delete, func, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from common.log import RequestIdMiddleware, configure_logging, get_logger
+from common.db import pool_stats
+from database import AsyncSessionLocal, AsyncReadSessionLocal, Base, engine, async_engine, async_read_engine
+from models import User, ChatHistory, ChatSummary
+from security import hash_password, verify_password, user_cache
+from semantic_cache import SEMANTIC_CACHE_ENABLED, semantic_cache
+from memory import HISTORY_TOKEN_BUDGET, ConversationMemory, load_memory, fold_into_summary
+from llm_chain import (
+    SUPPORTED_ENGINES, chain_registry, provider_router, invoke_routed, stream_routed
+)
+import base64
+import json
 import os
+import time
 from dotenv import load_dotenv
 from typing import Optional
 
 load_dotenv()
+configure_logging("chatbot")
+logger = get_logger(__name__)
 
 SECRET_KEY = os.getenv("SECRET_KEY", "secret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 Base.metadata.create_all(bind=engine)
+# create_all skips indexes on tables that already exist
+for index in ChatHistory.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
 
 app = FastAPI()
 
+# Engines whose chains are built before the first request (comma separated)
+WARM_ENGINES = [e for e in os.getenv("WARM_ENGINES", ",".join(SUPPORTED_ENGINES)).split(",") if e]
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Request-ID"],
 )
+app.add_middleware(RequestIdMiddleware)
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def get_password_hash(password: str):
-    # Encode and truncate to 72 bytes (bcrypt limit)
-    return pwd_context.hash(password.encode('utf-8')[:72])
+async def get_read_db():
+    # Replica session (the primary when no replica is configured); may lag recent writes
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
 
+@app.on_event("startup")
+async def warm_up_chains():
+    status = await run_in_threadpool(chain_registry.warm_up, WARM_ENGINES)
+    logger.info("Chain warm-up finished", extra={"engines": status})
 
-def verify_password(plain_password: str, hashed_password: str):
-    # Apply same truncation during verification
-    return pwd_context.verify(plain_password.encode('utf-8')[:72], hashed_password)
 
+@app.on_event("shutdown")
+async def close_chains():
+    await chain_registry.aclose()
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -61,7 +93,7 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -74,9 +106,15 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.username == username).first()
+    user = user_cache.get(username)
+    if user is not None:
+        return user
+    user = await db.scalar(select(User).where(User.username == username))
     if user is None:
         raise credentials_exception
+    # Cache a detached copy; only its column attributes are ever read
+    db.expunge(user)
+    user_cache.put(username, user)
     return user
 
 
@@ -85,25 +123,48 @@ class RegisterUser(BaseModel):
     password: str
 
 @app.get("/health", status_code=status.HTTP_200_OK)
-def health_check():
+async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "chains": chain_registry.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "providers": provider_router.stats(),
+        "db": {
+            "primary": pool_stats(async_engine),
+            "replica": pool_stats(async_read_engine) if async_read_engine is not async_engine else None,
+        },
+    }
+
+
 @app.post("/register")
-def register(user: RegisterUser, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.username == user.username).first()
+async def register(user: RegisterUser, db: AsyncSession = Depends(get_db)):
+    existing = await db.scalar(select(User).where(User.username == user.username))
     if existing:
         raise HTTPException(status_code=400, detail="Username already exists")
-    hashed_pw = get_password_hash(user.password)
+    hashed_pw = await hash_password(user.password)
     new_user = User(username=user.username, hashed_password=hashed_pw)
     db.add(new_user)
-    db.commit()
+    await db.commit()
     return {"message": "Registered successfully"}
 
 
 @app.post("/token")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(User).where(User.username == form_data.username))
+    if not user:
+        raise HTTPException(status_code=400, detail="Incorrect username or password")
+    valid, new_hash = await verify_password(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
+    if new_hash:
+        # Stored hash uses a different work factor than BCRYPT_ROUNDS
+        user.hashed_password = new_hash
+        await db.commit()
+        user_cache.invalidate(user.username)
     access_token = create_access_token(
         data={"sub": user.username},
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -116,39 +177,63 @@ class AskPrompt(BaseModel):
     engine: str
     use_history: Optional[bool] = True
     max_history: Optional[int] = 10
+    token_budget: Optional[int] = None
+    use_cache: Optional[bool] = False
+    # None follows LLM_HEDGE_ENABLED
+    hedge: Optional[bool] = None
+    fallback: Optional[bool] = True
 
 
-@app.post("/ask")
-def ask(req: AskPrompt, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    try:
-        print(f"🚩 Received engine: '{req.engine}'")
-        print(f"📚 Use history: {req.use_history}")
-        print(f"👤 User ID: {user.id}")
+def check_engine(req: AskPrompt):
+    if req.engine not in SUPPORTED_ENGINES:
+        raise HTTPException(status_code=400, detail=f"Unknown engine: '{req.engine}'")
 
-        if req.use_history:
-            chat_history_records = (
-                db.query(ChatHistory)
-                .filter(ChatHistory.user_id == user.id)
-                .order_by(ChatHistory.created_at.asc())  # ✅ OLDEST FIRST
-                .all()
-            )
 
-            recent_records = chat_history_records[-(req.max_history or 10):] if len(chat_history_records) > (req.max_history or 10) else chat_history_records
+async def cache_vector_for(req: AskPrompt, memory: ConversationMemory):
+    """
+    Embed the question when the semantic cache applies: it is enabled, the client
+    opted in and the answer doesn't depend on any conversation context.
+    """
+    if not (SEMANTIC_CACHE_ENABLED and req.use_cache) or memory.chat_history or memory.summary:
+        return None
+    return await run_in_threadpool(semantic_cache.embed, req.question)
 
-            chat_history = [
-                {"question": record.question, "answer": record.answer}
-                for record in recent_records
-            ]
 
-            print(f"📖 Retrieved {len(chat_history)} previous chat exchanges")
-            print(f"📝 Chat history preview: {chat_history[-2:] if chat_history else 'No history'}")
+async def save_chat(user_id: int, question: str, answer: str):
+    async with AsyncSessionLocal() as db:
+        db.add(ChatHistory(user_id=user_id, question=question, answer=answer))
+        await db.commit()
 
-            chain = get_chain_with_history(req.engine)
 
-            answer = invoke_with_history(chain, req.question, chat_history)
+@app.post("/ask")
+async def ask(req: AskPrompt, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db),
+              user: User = Depends(get_current_user)):
+    check_engine(req)
+    try:
+        logger.info("Ask", extra={"engine": req.engine, "use_history": req.use_history, "user_id": user.id})
 
+        if req.use_history:
+            memory = await load_memory(db, user.id, req.max_history or 10, req.token_budget or HISTORY_TOKEN_BUDGET)
+            chat_history = memory.chat_history
+            logger.debug("Retrieved %d previous chat exchanges", len(chat_history))
         else:
-            print("🔥 Using simple chain without history")
+            memory = ConversationMemory()
+            chat_history = []
+
+        answer = None
+        cache_vector = await cache_vector_for(req, memory)
+        if cache_vector is not None:
+            answer = semantic_cache.lookup(req.engine, cache_vector)
+
+        cached = answer is not None
+        served_by = req.engine
+        if not cached:
+            started = time.perf_counter()
+            served_by, answer = await invoke_routed(
+                req.engine, req.question, chat_history, memory.summary, req.hedge, req.fallback
+            )
+            if cache_vector is not None and answer:
+                semantic_cache.store(req.engine, req.question, answer, cache_vector, time.perf_counter() - started)
 
         chat = ChatHistory(
             user_id=user.id,
@@ -156,66 +241,194 @@ def ask(req: AskPrompt, db: Session = Depends(get_db), user: User = Depends(get_
             answer=answer
         )
         db.add(chat)
-        db.commit()
-        print(f"💾 Saved new chat to database")
+        await db.commit()
 
-        return {"answer": answer, "used_history": req.use_history}
+        if memory.needs_fold:
+            background_tasks.add_task(fold_into_summary, user.id, memory.oldest_kept_id, req.engine)
+
+        return {"answer": answer, "used_history": req.use_history, "cached": cached, "engine": served_by}
 
     except Exception as e:
-        print(f"❌ Error in ask endpoint: {str(e)}")
-        import traceback
-        print(f"🔍 Full traceback: {traceback.format_exc()}")
+        logger.exception("Error in ask endpoint")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to process request: {str(e)}"
         )
 
 
+@app.post("/ask/stream")
+async def ask_stream(req: AskPrompt, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
+    """
+    Server-sent events variant of /ask: emits a `token` event per chunk as the
+    LLM produces it and a final `done` event once the answer has been saved.
+    """
+    check_engine(req)
+    if req.use_history:
+        memory = await load_memory(db, user.id, req.max_history or 10, req.token_budget or HISTORY_TOKEN_BUDGET)
+    else:
+        memory = ConversationMemory()
+    user_id = user.id
+
+    cache_vector = await cache_vector_for(req, memory)
+    cached_answer = semantic_cache.lookup(req.engine, cache_vector) if cache_vector is not None else None
+
+    async def event_stream():
+        served_by = req.engine
+        if cached_answer is not None:
+            answer = cached_answer
+            yield {"event": "token", "data": answer}
+        else:
+            chunks = []
+            started = time.perf_counter()
+            try:
+                async for served_by, chunk in stream_routed(
+                        req.engine, req.question, memory.chat_history, memory.summary, req.hedge, req.fallback
+                ):
+                    chunks.append(chunk)
+                    yield {"event": "token", "data": chunk}
+            except Exception as e:
+                logger.exception("Error in ask stream")
+                yield {"event": "error", "data": json.dumps({"detail": f"Failed to process request: {str(e)}"})}
+                return
+
+            answer = "".join(chunks)
+            if cache_vector is not None and answer:
+                semantic_cache.store(req.engine, req.question, answer, cache_vector, time.perf_counter() - started)
+
+        # Persist only once the full answer has been produced
+        await save_chat(user_id, req.question, answer)
+        yield {"event": "done", "data": json.dumps({
+            "answer": answer, "used_history": req.use_history, "cached": cached_answer is not None,
+            "engine": served_by
+        })}
+
+    # Fold older turns into the summary once the stream has closed, like /ask does
+    fold = BackgroundTask(fold_into_summary, user_id, memory.oldest_kept_id, req.engine) if memory.needs_fold else None
+    return EventSourceResponse(event_stream(), background=fold)
+
+
+HISTORY_PAGE_SIZE = 50  # page size when only a cursor is given
+HISTORY_PAGE_MAX = 200
+EXPORT_BATCH_SIZE = 500
+
+
+def encode_cursor(created_at: datetime, chat_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{chat_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, chat_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(chat_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def history_select(user_id: int, preview_chars: Optional[int] = None):
+    # Truncate in SQL so long answers never leave the database when only a preview is wanted
+    answer = func.substr(ChatHistory.answer, 1, preview_chars) if preview_chars else ChatHistory.answer
+    return (
+        select(ChatHistory.id, ChatHistory.question, answer.label("answer"), ChatHistory.created_at)
+        .where(ChatHistory.user_id == user_id)
+        .order_by(ChatHistory.created_at.desc(), ChatHistory.id.desc())
+    )
+
+
+def history_row(row) -> dict:
+    return {
+        "id": row.id,
+        "question": row.question,
+        "answer": row.answer,
+        "created_at": row.created_at.isoformat()
+    }
+
+
 @app.get("/history")
-def history(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    chats = (
-        db.query(ChatHistory)
-        .filter(ChatHistory.user_id == user.id)
-        .order_by(ChatHistory.created_at.desc())
-        .all()
+async def history(
+        response: Response,
+        limit: Optional[int] = Query(None, ge=1, le=HISTORY_PAGE_MAX),
+        cursor: Optional[str] = None,
+        preview_chars: Optional[int] = Query(None, ge=1),
+        db: AsyncSession = Depends(get_read_db),
+        user: User = Depends(get_current_user)
+):
+    """
+    The user's chats, newest first. Without `limit` or `cursor` this is the whole
+    history. With `limit` it is one page: pass the `X-Next-Cursor` response header
+    back as `cursor` for the next one; it is absent on the last page.
+    """
+    stmt = history_select(user.id, preview_chars)
+    if limit is None and not cursor:
+        return [history_row(row) for row in (await db.execute(stmt)).all()]
+    limit = limit or HISTORY_PAGE_SIZE
+    if cursor:
+        created_at, chat_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(
+            ChatHistory.created_at < created_at,
+            and_(ChatHistory.created_at == created_at, ChatHistory.id < chat_id),
+        ))
+
+    # Fetch one extra row to know whether another page exists
+    rows = (await db.execute(stmt.limit(limit + 1))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return [history_row(row) for row in rows]
+
+
+@app.get("/history/export")
+async def export_history(preview_chars: Optional[int] = Query(None, ge=1), user: User = Depends(get_current_user)):
+    """
+    Stream the user's whole history as NDJSON (one chat per line, newest first)
+    from a server-side cursor, so memory use doesn't grow with history length.
+    """
+    user_id = user.id
+
+    async def ndjson():
+        async with AsyncReadSessionLocal() as db:
+            result = await db.stream(
+                history_select(user_id, preview_chars).execution_options(yield_per=EXPORT_BATCH_SIZE)
+            )
+            async for partition in result.partitions():
+                yield "".join(json.dumps(history_row(row)) + "\n" for row in partition)
+
+    return StreamingResponse(
+        ndjson(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="chat_history.ndjson"'}
     )
-    return [
-        {
-            "id": c.id,
-            "question": c.question,
-            "answer": c.answer,
-            "created_at": c.created_at.isoformat()
-        }
-        for c in chats
-    ]
 
 
 @app.delete("/history")
-def delete_history(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    deleted_count = db.query(ChatHistory).filter(ChatHistory.user_id == user.id).delete()
-    db.commit()
+async def delete_history(db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
+    result = await db.execute(delete(ChatHistory).where(ChatHistory.user_id == user.id))
+    deleted_count = result.rowcount
+    await db.execute(delete(ChatSummary).where(ChatSummary.user_id == user.id))
+    await db.commit()
     return {"message": f"Chat history cleared ({deleted_count} messages deleted)"}
 
 
 @app.get("/history/count")
-def history_count(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    count = db.query(ChatHistory).filter(ChatHistory.user_id == user.id).count()
+async def history_count(db: AsyncSession = Depends(get_read_db), user: User = Depends(get_current_user)):
+    count = await db.scalar(
+        select(func.count()).select_from(ChatHistory).where(ChatHistory.user_id == user.id)
+    )
     return {"count": count}
 
 
 @app.delete("/history/{chat_id}")
-def delete_specific_chat(chat_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    chat = (
-        db.query(ChatHistory)
-        .filter(ChatHistory.id == chat_id, ChatHistory.user_id == user.id)
-        .first()
+async def delete_specific_chat(chat_id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
+    chat = await db.scalar(
+        select(ChatHistory)
+        .where(ChatHistory.id == chat_id, ChatHistory.user_id == user.id)
     )
 
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
 
-    db.delete(chat)
-    db.commit()
+    await db.delete(chat)
+    await db.commit()
     return {"message": "Chat deleted successfully"}
 
 
@@ -0,0 +1,130 @@
+import sys
+from pathlib import Path
+
+# Make the shared Backend/common package importable when run from this directory
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.log import get_logger
+from database import AsyncSessionLocal
+from models import ChatHistory, ChatSummary
+from llm_chain import get_summary_chain
+
+logger = get_logger(__name__)
+
+# Default prompt budget for summary + raw history turns
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
+# How many old turns are folded into the summary per background update
+SUMMARY_FOLD_BATCH = int(os.getenv("SUMMARY_FOLD_BATCH", "20"))
+
+# Users whose summary is being updated in this process, so folds don't overlap
+_folding = set()
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    if not text:
+        return 0
+    return max(1, len(text) // 4)
+
+
+def turn_tokens(record: ChatHistory) -> int:
+    return count_tokens(record.question) + count_tokens(record.answer)
+
+
+@dataclass
+class ConversationMemory:
+    summary: str = ""
+    chat_history: List[Dict] = field(default_factory=list)
+    # Oldest ChatHistory.id that made it into the prompt; turns before it belong in the summary
+    oldest_kept_id: Optional[int] = None
+    needs_fold: bool = False
+
+
+async def load_memory(db: AsyncSession, user_id: int, max_history: int, token_budget: int) -> ConversationMemory:
+    """
+    Fit the rolling summary plus as many recent turns as possible into `token_budget`,
+    newest turns first, never exceeding `max_history` turns.
+    """
+    summary = await db.scalar(select(ChatSummary).where(ChatSummary.user_id == user_id))
+    summary_text = summary.summary if summary else ""
+    summarized_until_id = summary.summarized_until_id if summary else 0
+
+    records = (await db.scalars(ChatHistory.recent_for_user(user_id, max_history))).all()
+
+    remaining = token_budget - count_tokens(summary_text)
+    kept = []
+    for record in records:
+        if record.id <= summarized_until_id:
+            break
+        cost = turn_tokens(record)
+        # Always keep the latest turn, even if it alone exceeds the budget
+        if kept and cost > remaining:
+            break
+        kept.append(record)
+        remaining -= cost
+
+    oldest_kept_id = kept[-1].id if kept else None
+    # Either the budget/window cut turns off, or the user has more history than we fetched
+    needs_fold = oldest_kept_id is not None and (len(kept) < len(records) or len(records) == max_history)
+
+    return ConversationMemory(
+        summary=summary_text,
+        chat_history=[{"question": r.question, "answer": r.answer} for r in reversed(kept)],
+        oldest_kept_id=oldest_kept_id,
+        needs_fold=needs_fold,
+    )
+
+
+def format_turns(records: List[ChatHistory]) -> str:
+    return "\n".join(f"User: {r.question}\nAssistant: {r.answer}" for r in records)
+
+
+async def fold_into_summary(user_id: int, before_id: int, engine: str):
+    """
+    Fold the next batch of turns older than `before_id` that aren't summarized yet
+    into the user's stored summary. Runs after the response has been sent.
+    """
+    if user_id in _folding:
+        return
+    _folding.add(user_id)
+    try:
+        async with AsyncSessionLocal() as db:
+            summary = await db.scalar(select(ChatSummary).where(ChatSummary.user_id == user_id))
+            if summary is None:
+                summary = ChatSummary(user_id=user_id, summary="", summarized_until_id=0, token_count=0)
+                db.add(summary)
+
+            records = (await db.scalars(
+                select(ChatHistory)
+                .where(
+                    ChatHistory.user_id == user_id,
+                    ChatHistory.id > summary.summarized_until_id,
+                    ChatHistory.id < before_id,
+                )
+                .order_by(ChatHistory.id.asc())
+                .limit(SUMMARY_FOLD_BATCH)
+            )).all()
+            if not records:
+                return
+
+            updated = await get_summary_chain(engine).ainvoke({
+                "summary": summary.summary or "(none yet)",
+                "turns": format_turns(records),
+            })
+
+            summary.summary = updated.strip()
+            summary.summarized_until_id = records[-1].id
+            summary.token_count = count_tokens(summary.summary)
+            await db.commit()
+            logger.info("Folded %d turns into summary", len(records), extra={"user_id": user_id})
+    except Exception:
+        logger.exception("Summary update failed", extra={"user_id": user_id})
+    finally:
+        _folding.discard(user_id)
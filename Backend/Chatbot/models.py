@@ -1,14 +1,13 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+import sys
+from pathlib import Path
+
+# Make the shared Backend/common package importable when run from this directory
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, Index, select
 from database import Base
 from datetime import datetime
-
-class User(Base):
-    __tablename__ = "users"
-    # Ensure MySQL will auto-increment this primary key
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    username = Column(String(100), unique=True, index=True)
-    hashed_password = Column(String(200))
-    created_at = Column(DateTime, default=datetime.utcnow)
+from common.db import User  # users table shared with Persona_Flow
 
 class ChatHistory(Base):
     __tablename__ = "chat_history"
@@ -18,3 +17,29 @@ class ChatHistory(Base):
     question = Column(Text)
     answer = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Composite index so the per-user history window is an index range scan
+    __table_args__ = (
+        Index('idx_chat_user_created', 'user_id', 'created_at'),
+    )
+
+    @classmethod
+    def recent_for_user(cls, user_id: int, limit: int):
+        """Newest `limit` chats of a user, newest first (reverse for chronological order)."""
+        return (
+            select(cls)
+            .where(cls.user_id == user_id)
+            .order_by(cls.created_at.desc(), cls.id.desc())
+            .limit(limit)
+        )
+
+
+class ChatSummary(Base):
+    __tablename__ = "chat_summaries"
+    # One rolling summary per user, covering every chat up to summarized_until_id
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, index=True, nullable=False)
+    summary = Column(Text, nullable=False, default="")
+    summarized_until_id = Column(Integer, nullable=False, default=0)
+    token_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
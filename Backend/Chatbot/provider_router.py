@@ -0,0 +1,197 @@
+import sys
+from pathlib import Path
+
+# Make the shared Backend/common package importable when run from this directory
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from common.log import get_logger
+
+logger = get_logger(__name__)
+
+# Engines tried, in order, after the requested one fails or its breaker is open
+LLM_FALLBACK_ENGINES = [e for e in os.getenv("LLM_FALLBACK_ENGINES", "llama-3.1-8b-instant,gemini-2.5-flash-lite").split(",") if e]
+# Fire a second provider if the first hasn't produced a token within this many seconds
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+LLM_HEDGE_AFTER_S = float(os.getenv("LLM_HEDGE_AFTER_S", "2.0"))
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+LATENCY_WINDOW = 200
+# Samples needed before a provider's p95 is trusted for routing and hedge timing
+MIN_SAMPLES = 20
+
+
+class ProviderStats:
+    """Rolling time-to-first-token samples plus a consecutive-failure circuit breaker."""
+
+    def __init__(self):
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.consecutive_failures = 0
+        self.failures = 0
+        self.successes = 0
+        self.opened_at: Optional[float] = None
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if len(self.latencies) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= BREAKER_COOLDOWN_S:
+            return "half-open"
+        return "open"
+
+    def available(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        self.consecutive_failures += 1
+        # A failed half-open trial re-opens the breaker for another cooldown
+        if self.consecutive_failures >= BREAKER_FAILURES or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+
+class ProviderRouter:
+    """
+    Routes a chat request over the engines known to `get_chain`.
+
+    The requested engine goes first, then the configured fallbacks ordered by p95
+    time to first token; engines with an open circuit breaker are skipped. With
+    hedging on, the next candidate is started if no token has arrived within the
+    hedge budget (or the primary's p95, if lower) and whichever produces a token
+    first wins. Once a token has been sent, the answer is never switched.
+    """
+
+    def __init__(self, get_chain: Callable, fallbacks: List[str] = None):
+        self._get_chain = get_chain
+        self.fallbacks = LLM_FALLBACK_ENGINES if fallbacks is None else fallbacks
+        self._stats: Dict[str, ProviderStats] = {}
+
+    def stats_for(self, engine: str) -> ProviderStats:
+        if engine not in self._stats:
+            self._stats[engine] = ProviderStats()
+        return self._stats[engine]
+
+    def candidates(self, engine: str, fallback: bool = True) -> List[str]:
+        others = [e for e in dict.fromkeys(self.fallbacks) if e != engine] if fallback else []
+        others.sort(key=lambda e: self.stats_for(e).percentile(0.95) or float("inf"))
+        ordered = [e for e in [engine] + others if self.stats_for(e).available()]
+        # Everything tripped: still try the requested engine rather than fail outright
+        return ordered or [engine]
+
+    def hedge_delay(self, engine: str) -> float:
+        p95 = self.stats_for(engine).percentile(0.95)
+        return min(LLM_HEDGE_AFTER_S, p95) if p95 else LLM_HEDGE_AFTER_S
+
+    async def _open(self, engine: str, data: dict):
+        """Start a provider stream and wait for its first chunk."""
+        started = time.perf_counter()
+        stream = self._get_chain(engine).astream(data).__aiter__()
+        try:
+            first = await stream.__anext__()
+        except StopAsyncIteration:
+            first = ""
+        except BaseException:
+            await stream.aclose()
+            raise
+        self.stats_for(engine).record_success(time.perf_counter() - started)
+        return engine, stream, first
+
+    async def stream(self, engine: str, data: dict, hedge: Optional[bool] = None,
+                     fallback: bool = True) -> AsyncIterator[Tuple[str, str]]:
+        """Yield (serving engine, chunk) pairs for the routed answer."""
+        hedge = LLM_HEDGE_ENABLED if hedge is None else hedge
+        queue = self.candidates(engine, fallback)
+        tasks: Dict[asyncio.Task, str] = {}
+        errors = []
+
+        def launch():
+            name = queue.pop(0)
+            tasks[asyncio.create_task(self._open(name, data))] = name
+
+        launch()
+        winner = None
+        try:
+            while tasks and winner is None:
+                timeout = self.hedge_delay(tasks[next(iter(tasks))]) if hedge and queue else None
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.info("Hedging request", extra={"engine": queue[0], "after_s": timeout})
+                    launch()
+                    continue
+
+                for task in done:
+                    name = tasks.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        self.stats_for(name).record_failure()
+                        errors.append(f"{name}: {e}")
+                        logger.warning("Provider failed before first token: %s", e, extra={"engine": name})
+                        continue
+                    if winner is None:
+                        winner = result
+                    else:
+                        await result[1].aclose()
+
+                if winner is None and not tasks and queue:
+                    launch()
+        finally:
+            for task in tasks:
+                if task.done() and not task.cancelled() and task.exception() is None:
+                    await task.result()[1].aclose()
+                else:
+                    task.cancel()
+
+        if winner is None:
+            raise RuntimeError(f"All providers failed: {'; '.join(errors)}")
+
+        name, stream, first = winner
+        try:
+            if first:
+                yield name, first
+            async for chunk in stream:
+                if chunk:
+                    yield name, chunk
+        except Exception:
+            self.stats_for(name).record_failure()
+            raise
+        finally:
+            await stream.aclose()
+
+    async def invoke(self, engine: str, data: dict, hedge: Optional[bool] = None,
+                     fallback: bool = True) -> Tuple[str, str]:
+        """Return (serving engine, full answer)."""
+        served_by, chunks = engine, []
+        async for served_by, chunk in self.stream(engine, data, hedge, fallback):
+            chunks.append(chunk)
+        return served_by, "".join(chunks)
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        return {
+            engine: {
+                "state": s.state,
+                "p50_s": s.percentile(0.5),
+                "p95_s": s.percentile(0.95),
+                "samples": len(s.latencies),
+                "successes": s.successes,
+                "failures": s.failures,
+            }
+            for engine, s in self._stats.items()
+        }
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+# bcrypt work factor; hashes with any other cost are upgraded (or downgraded) on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Dedicated bcrypt threads so login storms can't take over the request threadpool
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+_hash_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+
+def _encode(password: str) -> bytes:
+    # Encode and truncate to 72 bytes (bcrypt limit)
+    return password.encode('utf-8')[:72]
+
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_pool, pwd_context.hash, _encode(password))
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check a password on the bcrypt pool. Returns (valid, new_hash) where new_hash is set
+    when the stored hash doesn't use the configured work factor and should be replaced.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_pool, pwd_context.verify_and_update, _encode(plain_password), hashed_password)
+
+
+class UserCache:
+    """
+    Short-lived cache from JWT subject to a detached user row, so authenticated
+    requests don't hit the users table every time. Only used from the event loop.
+    """
+
+    def __init__(self, ttl: int = USER_CACHE_TTL, max_size: int = USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: Dict[str, Tuple[float, object]] = {}
+
+    def get(self, username: str):
+        entry = self._entries.get(username)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._entries[username]
+            return None
+        return user
+
+    def put(self, username: str, user):
+        if len(self._entries) >= self.max_size:
+            # Dicts keep insertion order, so this drops the oldest entry
+            del self._entries[next(iter(self._entries))]
+        self._entries[username] = (time.monotonic() + self.ttl, user)
+
+    def invalidate(self, username: str):
+        self._entries.pop(username, None)
+
+
+user_cache = UserCache()
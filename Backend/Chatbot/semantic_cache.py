@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+
+
+@dataclass
+class CacheEntry:
+    engine: str
+    question: str
+    answer: str
+    created_at: float
+    # How long the LLM took to produce the answer, credited to saved latency on each hit
+    latency: float
+
+
+class SemanticCache:
+    """
+    In-memory semantic cache of answers to context-free questions.
+
+    Questions are embedded with sentence-transformers (normalized, so cosine similarity
+    is a dot product) into a fixed-size matrix; a lookup is one matrix-vector product
+    over the live slots of the same engine. Entries expire after `ttl` seconds and the
+    least recently used entry is evicted when the cache is full.
+    """
+
+    def __init__(self, model_name: str = SEMANTIC_CACHE_MODEL, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 ttl: int = SEMANTIC_CACHE_TTL, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._model = None
+        self._vectors: Optional[np.ndarray] = None
+        self._live = np.zeros(max_entries, dtype=bool)
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()  # slot -> entry, LRU order
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._saved_latency = 0.0
+
+    def _encoder(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def embed(self, question: str) -> np.ndarray:
+        """CPU-bound; call from a worker thread."""
+        vector = self._encoder().encode(question.strip().lower(), normalize_embeddings=True)
+        return np.asarray(vector, dtype=np.float32)
+
+    def _drop(self, slot: int):
+        self._entries.pop(slot, None)
+        self._live[slot] = False
+        self._free.append(slot)
+
+    def lookup(self, engine: str, vector: np.ndarray) -> Optional[str]:
+        with self._lock:
+            if self._vectors is None or not self._entries:
+                self._misses += 1
+                return None
+
+            now = time.time()
+            scores = self._vectors @ vector
+            scores[~self._live] = -1.0
+            for slot in np.argsort(scores)[::-1]:
+                slot = int(slot)
+                if scores[slot] < self.threshold:
+                    break
+                entry = self._entries.get(slot)
+                if entry is None or entry.engine != engine:
+                    continue
+                if now - entry.created_at > self.ttl:
+                    self._drop(slot)
+                    continue
+                self._entries.move_to_end(slot)
+                self._hits += 1
+                self._saved_latency += entry.latency
+                return entry.answer
+
+            self._misses += 1
+            return None
+
+    def store(self, engine: str, question: str, answer: str, vector: np.ndarray, latency: float):
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            if not self._free:
+                lru_slot = next(iter(self._entries))
+                self._drop(lru_slot)
+            slot = self._free.pop()
+            self._vectors[slot] = vector
+            self._live[slot] = True
+            self._entries[slot] = CacheEntry(engine, question, answer, time.time(), latency)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "enabled": SEMANTIC_CACHE_ENABLED,
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / total, 4) if total else 0.0,
+                "saved_latency_s": round(self._saved_latency, 3),
+            }
+
+
+semantic_cache = SemanticCache()
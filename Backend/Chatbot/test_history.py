@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+
+from database import SessionLocal
+from models import User
+
+
+@pytest.fixture
+def headers(client, user_id):
+    from main import create_access_token
+
+    with SessionLocal() as db:
+        username = db.get(User, user_id).username
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+
+def test_history_unpaged_returns_everything(client, headers, user_id, add_chats):
+    ids = add_chats(user_id, [(f"q{n}", f"a{n}") for n in range(60)])
+
+    response = client.get("/history", headers=headers)
+
+    assert [chat["id"] for chat in response.json()] == ids[::-1]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_history_cursor_pages_through_ties(client, headers, user_id, add_chats):
+    # Same timestamp everywhere, so only the id half of the cursor orders the pages
+    ids = add_chats(user_id, [(f"q{n}", f"a{n}") for n in range(7)], created_at=datetime(2026, 1, 1, 12))
+
+    seen, params = [], {"limit": 3}
+    while True:
+        response = client.get("/history", headers=headers, params=params)
+        assert response.status_code == 200
+        page = [chat["id"] for chat in response.json()]
+        assert len(page) <= 3
+        seen += page
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params = {"limit": 3, "cursor": cursor}
+
+    assert seen == ids[::-1]
+
+
+def test_history_cursor_without_limit_uses_default_page(client, headers, user_id, add_chats, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "HISTORY_PAGE_SIZE", 2)
+    ids = add_chats(user_id, [(f"q{n}", f"a{n}") for n in range(5)])
+    first = client.get("/history", headers=headers, params={"limit": 2})
+
+    second = client.get("/history", headers=headers, params={"cursor": first.headers["X-Next-Cursor"]})
+
+    assert [chat["id"] for chat in second.json()] == [ids[2], ids[1]]
+    assert "X-Next-Cursor" in second.headers
+
+
+def test_history_rejects_bad_cursor(client, headers):
+    assert client.get("/history", headers=headers, params={"cursor": "nope"}).status_code == 400
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import memory
+from common.db import to_async_url
+from database import DATABASE_URL
+from memory import count_tokens, fold_into_summary, load_memory
+from models import ChatSummary
+
+# 10 + 10 tokens per turn
+TURN = ("q" * 40, "a" * 40)
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    # A fresh engine per test: pooled aiosqlite connections can't move between event loops
+    engine = create_async_engine(to_async_url(DATABASE_URL), poolclass=NullPool)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(memory, "AsyncSessionLocal", sessions)
+    return sessions
+
+
+def load(sessions, user_id: int, max_history: int = 10, token_budget: int = 2000):
+    async def run():
+        async with sessions() as db:
+            return await load_memory(db, user_id, max_history, token_budget)
+
+    return asyncio.run(run())
+
+
+def stored_summary(sessions, user_id: int):
+    async def run():
+        async with sessions() as db:
+            return await db.scalar(select(ChatSummary).where(ChatSummary.user_id == user_id))
+
+    return asyncio.run(run())
+
+
+def test_load_memory_keeps_newest_turns_within_budget(sessions, user_id, add_chats):
+    ids = add_chats(user_id, [(f"{n}{TURN[0]}", TURN[1]) for n in range(5)])
+
+    mem = load(sessions, user_id, token_budget=65)
+
+    assert [turn["question"][0] for turn in mem.chat_history] == ["2", "3", "4"]
+    assert mem.oldest_kept_id == ids[2]
+    assert mem.needs_fold
+
+
+def test_load_memory_keeps_latest_turn_over_budget(sessions, user_id, add_chats):
+    ids = add_chats(user_id, [TURN, ("q", "a" * 4000)])
+
+    mem = load(sessions, user_id, token_budget=50)
+
+    assert len(mem.chat_history) == 1
+    assert mem.oldest_kept_id == ids[1]
+    assert mem.needs_fold
+
+
+def test_load_memory_no_fold_when_everything_fits(sessions, user_id, add_chats):
+    add_chats(user_id, [TURN] * 3)
+
+    mem = load(sessions, user_id)
+
+    assert len(mem.chat_history) == 3
+    assert not mem.needs_fold
+
+
+def test_load_memory_fold_when_window_is_full(sessions, user_id, add_chats):
+    add_chats(user_id, [TURN] * 3)
+
+    assert load(sessions, user_id, max_history=3).needs_fold
+
+
+def test_load_memory_skips_summarized_turns_and_charges_the_summary(sessions, user_id, add_chats):
+    ids = add_chats(user_id, [TURN] * 4)
+
+    async def summarize():
+        async with sessions() as db:
+            db.add(ChatSummary(user_id=user_id, summary="s" * 40, summarized_until_id=ids[1], token_count=10))
+            await db.commit()
+
+    asyncio.run(summarize())
+
+    assert len(load(sessions, user_id).chat_history) == 2
+    # 10 summary tokens leave room for one 20-token turn
+    mem = load(sessions, user_id, token_budget=35)
+    assert mem.summary == "s" * 40
+    assert mem.oldest_kept_id == ids[3]
+
+
+class FakeSummaryChain:
+    def __init__(self):
+        self.inputs = []
+
+    async def ainvoke(self, data):
+        self.inputs.append(data)
+        return f"  summary {len(self.inputs)}  "
+
+
+def test_fold_into_summary_folds_turns_before_the_kept_window(sessions, user_id, add_chats, monkeypatch):
+    chain = FakeSummaryChain()
+    monkeypatch.setattr(memory, "get_summary_chain", lambda engine: chain)
+    monkeypatch.setattr(memory, "SUMMARY_FOLD_BATCH", 2)
+    ids = add_chats(user_id, [(f"question {n}", f"answer {n}") for n in range(5)])
+
+    asyncio.run(fold_into_summary(user_id, ids[3], "fake"))
+    summary = stored_summary(sessions, user_id)
+    assert summary.summary == "summary 1"
+    assert summary.summarized_until_id == ids[1]
+    assert summary.token_count == count_tokens("summary 1")
+    assert chain.inputs[0]["summary"] == "(none yet)"
+    assert "question 0" in chain.inputs[0]["turns"] and "question 2" not in chain.inputs[0]["turns"]
+
+    asyncio.run(fold_into_summary(user_id, ids[3], "fake"))
+    assert stored_summary(sessions, user_id).summarized_until_id == ids[2]
+    assert chain.inputs[1]["summary"] == "summary 1"
+    assert "question 2" in chain.inputs[1]["turns"]
+
+    # Nothing left before the kept window
+    asyncio.run(fold_into_summary(user_id, ids[3], "fake"))
+    assert len(chain.inputs) == 2
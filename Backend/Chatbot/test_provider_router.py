@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+import pytest
+
+import provider_router
+from provider_router import ProviderRouter
+
+
+class FakeChain:
+    """Async chain whose astream() sleeps `delay` seconds, then fails or yields `chunks`."""
+
+    def __init__(self, name: str, calls: list, chunks=("hello", " world"), delay: float = 0.0, fail: bool = False):
+        self.name = name
+        self.calls = calls
+        self.chunks = chunks
+        self.delay = delay
+        self.fail = fail
+        self.closed = False
+
+    async def astream(self, data):
+        self.calls.append(self.name)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise ConnectionError(f"{self.name} is down")
+            for chunk in self.chunks:
+                yield chunk
+        finally:
+            self.closed = True
+
+
+def make_router(calls: list, fallbacks=("b", "c"), **chains) -> ProviderRouter:
+    chains = {name: chains.get(name) or FakeChain(name, calls) for name in ("a", *fallbacks)}
+    router = ProviderRouter(lambda engine: chains[engine], list(fallbacks))
+    router.chains = chains
+    return router
+
+
+def invoke(router: ProviderRouter, engine: str = "a", **kwargs):
+    return asyncio.run(router.invoke(engine, {"question": "hi"}, **kwargs))
+
+
+@pytest.fixture(autouse=True)
+def breaker(monkeypatch):
+    monkeypatch.setattr(provider_router, "BREAKER_FAILURES", 2)
+    monkeypatch.setattr(provider_router, "BREAKER_COOLDOWN_S", 0.2)
+
+
+def test_falls_back_in_order():
+    calls = []
+    router = make_router(calls, a=FakeChain("a", calls, fail=True), b=FakeChain("b", calls, fail=True))
+
+    assert invoke(router, hedge=False) == ("c", "hello world")
+    assert calls == ["a", "b", "c"]
+
+
+def test_no_fallback_when_disabled():
+    calls = []
+    router = make_router(calls, a=FakeChain("a", calls, fail=True))
+
+    with pytest.raises(RuntimeError):
+        invoke(router, hedge=False, fallback=False)
+    assert calls == ["a"]
+
+
+def test_breaker_opens_skips_provider_and_recovers_half_open():
+    calls = []
+    router = make_router(calls, a=FakeChain("a", calls, fail=True))
+
+    for _ in range(2):
+        assert invoke(router, hedge=False)[0] == "b"
+    assert router.stats_for("a").state == "open"
+
+    calls.clear()
+    assert invoke(router, hedge=False)[0] == "b"
+    assert calls == ["b"]
+
+    time.sleep(0.25)
+    assert router.stats_for("a").state == "half-open"
+    router.chains["a"].fail = False
+    calls.clear()
+    assert invoke(router, hedge=False)[0] == "a"
+    assert calls == ["a"]
+    assert router.stats_for("a").state == "closed"
+
+
+def test_failed_half_open_trial_reopens_breaker():
+    calls = []
+    router = make_router(calls, a=FakeChain("a", calls, fail=True))
+    for _ in range(2):
+        invoke(router, hedge=False)
+
+    time.sleep(0.25)
+    calls.clear()
+    assert invoke(router, hedge=False)[0] == "b"
+    assert calls == ["a", "b"]
+    assert router.stats_for("a").state == "open"
+
+
+def test_hedge_fires_after_delay_and_closes_the_losing_stream(monkeypatch):
+    monkeypatch.setattr(provider_router, "LLM_HEDGE_AFTER_S", 0.05)
+    calls = []
+    slow = FakeChain("a", calls, chunks=("slow",), delay=5)
+    router = make_router(calls, a=slow)
+
+    async def run():
+        started = time.perf_counter()
+        answer = await router.invoke("a", {"question": "hi"}, hedge=True)
+        await asyncio.sleep(0)  # let the cancelled primary unwind
+        return answer, time.perf_counter() - started
+
+    (served_by, answer), elapsed = asyncio.run(run())
+
+    assert (served_by, answer) == ("b", "hello world")
+    assert calls == ["a", "b"]
+    assert elapsed < 1
+    assert slow.closed
+
+
+def test_hedge_not_fired_when_primary_answers_in_time(monkeypatch):
+    monkeypatch.setattr(provider_router, "LLM_HEDGE_AFTER_S", 0.5)
+    calls = []
+    router = make_router(calls, a=FakeChain("a", calls, delay=0.01))
+
+    assert invoke(router, hedge=True) == ("a", "hello world")
+    assert calls == ["a"]
+
+
+def test_all_providers_failed():
+    calls = []
+    router = make_router(calls, **{name: FakeChain(name, calls, fail=True) for name in ("a", "b", "c")})
+
+    with pytest.raises(RuntimeError, match="All providers failed") as error:
+        invoke(router, hedge=False)
+    for name in ("a", "b", "c"):
+        assert f"{name}: {name} is down" in str(error.value)
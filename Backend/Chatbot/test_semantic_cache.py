@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+import semantic_cache
+from semantic_cache import SemanticCache
+
+
+def unit(*values) -> np.ndarray:
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def cache():
+    return SemanticCache(threshold=0.9, ttl=60, max_entries=2)
+
+
+def test_hit_above_threshold_only(cache):
+    cache.store("groq", "capital of france?", "Paris", unit(1, 0, 0), latency=1.5)
+
+    assert cache.lookup("groq", unit(1, 0.1, 0)) == "Paris"  # cosine ~0.995
+    assert cache.lookup("groq", unit(1, 1, 0)) is None  # cosine ~0.707
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["saved_latency_s"] == 1.5
+
+
+def test_answers_are_per_engine(cache):
+    cache.store("groq", "capital of france?", "Paris", unit(1, 0, 0), latency=1.0)
+
+    assert cache.lookup("gemini", unit(1, 0, 0)) is None
+
+
+def test_expired_entries_are_dropped(cache, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(semantic_cache.time, "time", lambda: now)
+    cache.store("groq", "capital of france?", "Paris", unit(1, 0, 0), latency=1.0)
+
+    now += 61
+    assert cache.lookup("groq", unit(1, 0, 0)) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    cache.store("groq", "a", "A", unit(1, 0, 0), latency=1.0)
+    cache.store("groq", "b", "B", unit(0, 1, 0), latency=1.0)
+    assert cache.lookup("groq", unit(1, 0, 0)) == "A"  # b is now the least recently used
+
+    cache.store("groq", "c", "C", unit(0, 0, 1), latency=1.0)
+
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup("groq", unit(0, 1, 0)) is None
+    assert cache.lookup("groq", unit(1, 0, 0)) == "A"
+    assert cache.lookup("groq", unit(0, 0, 1)) == "C"
@@ -1,5 +1,12 @@
+import sys
+from pathlib import Path
+
+# Make the shared Backend/common package importable when run from this directory
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
 import os
 from dotenv import load_dotenv
+from common.log import RequestIdMiddleware, configure_logging
 from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel
 from sqlalchemy import create_engine
@@ -8,7 +15,9 @@ from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
 from langchain_community.utilities.sql_database import SQLDatabase
 from langchain_google_genai import ChatGoogleGenerativeAI
 load_dotenv()
+configure_logging("db-chat")
 app = FastAPI(title="Database Speaks - AI SQL Assistant", version="1.0")
+app.add_middleware(RequestIdMiddleware)
 
 class ChatRequest(BaseModel):
     query: str
@@ -0,0 +1,90 @@
+"""
+Round-trip benchmark for GET /user/{user_id}/characters.
+
+Compares the old per-persona COUNT(*) listing with list_user_characters() on a
+local SQLite database, counting the SQL statements each one sends:
+
+    python bench_characters.py
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+db_path = os.path.join(tempfile.mkdtemp(), "bench_characters.db")
+os.environ["DATABASE_URL_ONLINE"] = f"sqlite:///{db_path}"
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from database_persona import Base, engine
+from models_persona import PersonaFlow, PersonaMessage
+from crud_persona import list_user_characters, backfill_message_counts
+
+MESSAGES_PER_PERSONA = 20
+statements = 0
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def count_statement(*_args):
+    global statements
+    statements += 1
+
+
+def old_listing(db: Session, user_id: int):
+    personas = (
+        db.query(PersonaFlow)
+        .filter(PersonaFlow.user_id == user_id)
+        .order_by(PersonaFlow.created_at.desc())
+        .all()
+    )
+    return [
+        (p.id, db.query(PersonaMessage).filter(PersonaMessage.persona_id == p.id).count())
+        for p in personas
+    ]
+
+
+def new_listing(db: Session, user_id: int):
+    _, personas = list_user_characters(db, user_id, limit=200, offset=0)
+    return [(p.id, p.message_count) for p in personas]
+
+
+def measure(fn, db: Session, user_id: int):
+    global statements
+    db.expunge_all()
+    statements = 0
+    started = time.perf_counter()
+    result = fn(db, user_id)
+    return result, statements, (time.perf_counter() - started) * 1000
+
+
+def seed(db: Session, user_id: int, personas: int):
+    for _ in range(personas):
+        persona = PersonaFlow(user_id=user_id, character_name="Bench", mode="auto", tone="neutral", summary="")
+        db.add(persona)
+        db.flush()
+        db.execute(insert(PersonaMessage), [
+            {"persona_id": persona.id, "sender": "user", "message": f"message {i}"}
+            for i in range(MESSAGES_PER_PERSONA)
+        ])
+    db.commit()
+    backfill_message_counts(db)
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    print(f"{'personas':>8}  {'old queries':>11}  {'old ms':>7}  {'new queries':>11}  {'new ms':>7}")
+    with Session(engine) as db:
+        for user_id, personas in enumerate((1, 10, 50, 200), start=1):
+            seed(db, user_id, personas)
+            old, old_statements, old_ms = measure(old_listing, db, user_id)
+            new, new_statements, new_ms = measure(new_listing, db, user_id)
+            assert sorted(old) == sorted(new)
+            print(f"{personas:>8}  {old_statements:>11}  {old_ms:>7.2f}  {new_statements:>11}  {new_ms:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
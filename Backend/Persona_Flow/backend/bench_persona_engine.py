@@ -0,0 +1,81 @@
+"""
+Calls-per-reply and latency of the two persona chat engines ("fast" vs. "agentic").
+
+Runs real Gemini calls (GEMINI_KEY must be set) against a throwaway persona and
+counts every LLM request each engine makes:
+
+    python bench_persona_engine.py --replies 5
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("DATABASE_URL_ONLINE", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_persona.db')}")
+
+import litellm
+from langchain_core.callbacks import BaseCallbackHandler
+
+import main
+
+llm_calls = 0
+
+
+def count_litellm_call(*_args):
+    global llm_calls
+    llm_calls += 1
+
+
+class CountChatModelCalls(BaseCallbackHandler):
+    def on_chat_model_start(self, *_args, **_kwargs):
+        global llm_calls
+        llm_calls += 1
+
+
+# CrewAI talks to Gemini through litellm; the fast engine through LangChain
+litellm.success_callback.append(count_litellm_call)
+litellm.failure_callback.append(count_litellm_call)
+main.gemini_chat_llm.callbacks = [CountChatModelCalls()]
+
+PERSONA = SimpleNamespace(
+    id=0,
+    character_name="Sherlock Holmes",
+    tone="witty",
+    summary="Consulting detective from 221B Baker Street; observant, precise, a little arrogant.",
+)
+HISTORY = [
+    SimpleNamespace(sender="user", message="Good evening, Mr. Holmes."),
+    SimpleNamespace(sender="agent", message="Good evening. You have come from the station, I perceive."),
+]
+QUESTIONS = [
+    "How did you know that?",
+    "What do you make of the missing necklace?",
+    "Should we call Inspector Lestrade?",
+]
+
+
+def run(engine: str, replies: int):
+    global llm_calls
+    calls, latencies = [], []
+    for i in range(replies):
+        llm_calls = 0
+        started = time.perf_counter()
+        main.generate_reply(engine, PERSONA, HISTORY, QUESTIONS[i % len(QUESTIONS)])
+        latencies.append(time.perf_counter() - started)
+        calls.append(llm_calls)
+    return calls, latencies
+
+
+def main_bench(replies: int):
+    print(f"{'engine':<8}  {'calls/reply':>11}  {'p50 s':>6}  {'max s':>6}")
+    for engine in main.CHAT_ENGINES:
+        calls, latencies = run(engine, replies)
+        print(f"{engine:<8}  {statistics.mean(calls):>11.1f}  {statistics.median(latencies):>6.2f}  {max(latencies):>6.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replies", type=int, default=5)
+    main_bench(parser.parse_args().replies)
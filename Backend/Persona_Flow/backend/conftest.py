@@ -0,0 +1,48 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Make the shared Backend/common package importable when run from this directory
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+# The engines are built at import time, so point them at a scratch SQLite file first
+os.environ["DATABASE_URL_ONLINE"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'persona_test.db')}"
+os.environ.pop("DATABASE_URL_REPLICA", None)
+os.environ.setdefault("GEMINI_KEY", "test")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+import itertools
+
+import pytest
+from fastapi.testclient import TestClient
+
+_user_ids = itertools.count(1000)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def user_id():
+    return next(_user_ids)
+
+
+@pytest.fixture
+def make_persona(client):
+    from database_persona import SessionLocal
+    from models_persona import PersonaFlow
+
+    def make(user_id: int, name: str = "Sherlock", summary: str = "A consulting detective.", tone: str = "neutral"):
+        with SessionLocal() as db:
+            persona = PersonaFlow(user_id=user_id, character_name=name, mode="custom", tone=tone, summary=summary)
+            db.add(persona)
+            db.commit()
+            return persona.id
+
+    return make
@@ -0,0 +1,154 @@
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update, insert, delete, func, or_, and_
+from sqlalchemy.orm import Session
+
+from models_persona import PersonaFlow, PersonaMessage
+
+
+def list_user_characters(db: Session, user_id: int, limit: Optional[int] = None,
+                         offset: int = 0) -> Tuple[int, List[PersonaFlow]]:
+    """
+    A user's personas, newest first, with the user's total persona count; a
+    `limit` of None returns all of them. Served by a single query: counts come
+    from PersonaFlow.message_count and the total from a window function over
+    the same scan.
+    """
+    query = (
+        select(PersonaFlow, func.count().over().label("total"))
+        .where(PersonaFlow.user_id == user_id, PersonaFlow.deleted_at.is_(None))
+        .order_by(PersonaFlow.created_at.desc(), PersonaFlow.id.desc())
+        .offset(offset)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    rows = db.execute(query).all()
+
+    if rows:
+        return rows[0].total, [row.PersonaFlow for row in rows]
+
+    # Past the last page the window total is unavailable
+    total = db.scalar(
+        select(func.count()).select_from(PersonaFlow)
+        .where(PersonaFlow.user_id == user_id, PersonaFlow.deleted_at.is_(None))
+    ) if offset else 0
+    return total, []
+
+
+def get_user_persona(db: Session, user_id: int, persona_id: int) -> Optional[PersonaFlow]:
+    """The user's persona, unless it doesn't exist, belongs to someone else or is deleted."""
+    return (
+        db.query(PersonaFlow)
+        .filter(PersonaFlow.id == persona_id, PersonaFlow.user_id == user_id, PersonaFlow.deleted_at.is_(None))
+        .first()
+    )
+
+
+def delete_personas(db: Session, user_id: int, persona_ids: Optional[List[int]] = None,
+                    soft: bool = False) -> List[Tuple[int, str]]:
+    """
+    Delete the user's personas (all of them when `persona_ids` is None) with set-based
+    statements; nothing is loaded into the session. A hard delete leaves the messages
+    to the foreign key's ON DELETE CASCADE; a soft delete only stamps deleted_at and
+    leaves the rows to purge_deleted(). Returns the (id, character_name) deleted.
+    """
+    query = select(PersonaFlow.id, PersonaFlow.character_name).where(
+        PersonaFlow.user_id == user_id, PersonaFlow.deleted_at.is_(None)
+    )
+    if persona_ids is not None:
+        query = query.where(PersonaFlow.id.in_(persona_ids))
+    targets = [tuple(row) for row in db.execute(query).all()]
+    ids = [persona_id for persona_id, _ in targets]
+    if ids:
+        if soft:
+            db.execute(update(PersonaFlow).where(PersonaFlow.id.in_(ids)).values(deleted_at=datetime.utcnow()))
+        else:
+            db.execute(delete(PersonaFlow).where(PersonaFlow.id.in_(ids)))
+        db.commit()
+    return targets
+
+
+def purge_deleted(db: Session, batch_size: int) -> int:
+    """
+    One purge step for soft-deleted personas: delete up to `batch_size` messages of one
+    of them, or the persona row itself once it has none left. Returns rows deleted,
+    0 when there is nothing to purge. Short transactions keep lock times low.
+    """
+    persona_id = db.scalar(select(PersonaFlow.id).where(PersonaFlow.deleted_at.is_not(None)).limit(1))
+    if persona_id is None:
+        return 0
+    # MySQL can't LIMIT inside an IN subquery, so pick the ids first
+    message_ids = db.scalars(
+        select(PersonaMessage.id).where(PersonaMessage.persona_id == persona_id).limit(batch_size)
+    ).all()
+    if message_ids:
+        db.execute(delete(PersonaMessage).where(PersonaMessage.id.in_(message_ids)))
+    else:
+        db.execute(delete(PersonaFlow).where(PersonaFlow.id == persona_id))
+    db.commit()
+    return len(message_ids) or 1
+
+
+def recent_messages(db: Session, persona_id: int, limit: int) -> List[PersonaMessage]:
+    """The persona's last `limit` messages, oldest first."""
+    msgs = (
+        db.query(PersonaMessage)
+        .filter(PersonaMessage.persona_id == persona_id)
+        # Messages saved in one batch share a timestamp; id keeps them in order
+        .order_by(PersonaMessage.created_at.desc(), PersonaMessage.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return list(reversed(msgs))
+
+
+def history_page(db: Session, persona_id: int, limit: Optional[int],
+                 before: Optional[Tuple[datetime, int]] = None) -> Tuple[List[PersonaMessage], bool]:
+    """
+    Up to `limit` messages older than the `before` (created_at, id) keyset, oldest
+    first, and whether older messages remain. Walks idx_persona_created backwards.
+    A `limit` of None returns every such message.
+    """
+    query = db.query(PersonaMessage).filter(PersonaMessage.persona_id == persona_id)
+    if before:
+        created_at, message_id = before
+        query = query.filter(or_(
+            PersonaMessage.created_at < created_at,
+            and_(PersonaMessage.created_at == created_at, PersonaMessage.id < message_id),
+        ))
+    query = query.order_by(PersonaMessage.created_at.desc(), PersonaMessage.id.desc())
+    if limit is None:
+        return list(reversed(query.all())), False
+    # One extra row tells whether another page exists
+    msgs = query.limit(limit + 1).all()
+    return list(reversed(msgs[:limit])), len(msgs) > limit
+
+
+def save_message_rows(db: Session, rows: List[Dict]):
+    """
+    Bulk-insert message rows ({persona_id, sender, message}, plus created_at when
+    the caller stamps it) for any number of personas and bump each persona's message_count in the same transaction.
+    """
+    if not rows:
+        return
+    db.execute(insert(PersonaMessage), rows)
+    for persona_id, added in Counter(row["persona_id"] for row in rows).items():
+        db.execute(
+            update(PersonaFlow)
+            .where(PersonaFlow.id == persona_id)
+            .values(message_count=PersonaFlow.message_count + added)
+        )
+    db.commit()
+
+
+def backfill_message_counts(db: Session):
+    """Recompute every persona's message_count with one grouped UPDATE."""
+    counts = (
+        select(func.count(PersonaMessage.id))
+        .where(PersonaMessage.persona_id == PersonaFlow.id)
+        .scalar_subquery()
+    )
+    db.execute(update(PersonaFlow).values(message_count=counts))
+    db.commit()
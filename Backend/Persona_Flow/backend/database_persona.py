@@ -1,11 +1,33 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateColumn
 from dotenv import load_dotenv
+from common.db import Base, create_db_engine, replica_url
 
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL_ONLINE")  # MySQL URL
 
-engine = create_engine(DATABASE_URL)
+engine = create_db_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+
+# History reads go to DATABASE_URL_REPLICA when one is configured
+REPLICA_URL = replica_url()
+read_engine = create_db_engine(REPLICA_URL) if REPLICA_URL else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+
+def add_missing_columns(table) -> list:
+    """
+    create_all() never alters existing tables; add any columns the model has
+    gained since the table was created. Returns the names of added columns.
+    """
+    existing = {c["name"] for c in inspect(engine).get_columns(table.name)}
+    added = []
+    with engine.begin() as conn:
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                added.append(column.name)
+    return added
@@ -0,0 +1,134 @@
+import os
+import threading
+from collections import OrderedDict, deque
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterable, List, Tuple
+
+HISTORY_CACHE_ENABLED = os.getenv("PERSONA_HISTORY_CACHE", "true").lower() == "true"
+HISTORY_CACHE_MESSAGES = int(os.getenv("PERSONA_HISTORY_CACHE_MESSAGES", "50"))  # ring size per persona
+HISTORY_CACHE_MB = float(os.getenv("PERSONA_HISTORY_CACHE_MB", "64"))
+
+MESSAGE_OVERHEAD_BYTES = 120  # rough per-message cost of the namespace, deque slot and str headers
+
+
+def _size(message) -> int:
+    return len(message.message) + MESSAGE_OVERHEAD_BYTES
+
+
+class HistoryCache:
+    """
+    Recent messages per persona, kept in process so steady-state chat turns
+    need no history query.
+
+    Each persona gets a ring buffer of its last `capacity` messages, loaded
+    lazily on first access and appended to as turns are saved. Personas are
+    evicted least recently used first once the total size passes `max_bytes`.
+    The cache is per process: it assumes a persona's turns are all served by
+    this process, so disable it when running several workers.
+    """
+
+    def __init__(self, enabled: bool = HISTORY_CACHE_ENABLED, capacity: int = HISTORY_CACHE_MESSAGES,
+                 max_mb: float = HISTORY_CACHE_MB):
+        self.enabled = enabled
+        self.capacity = capacity
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, deque]" = OrderedDict()
+        self._bytes: Dict[int, int] = {}
+        self._total_bytes = 0
+        # Personas being loaded -> whether a message arrived during the load
+        self._loading: Dict[int, bool] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def recent(self, persona_id: int, max_history: int, load: Callable[[int], List]) -> List:
+        """
+        Last `max_history` messages, oldest first. `load(limit)` reads them from
+        the database on a miss, or whenever more are asked for than are kept.
+        """
+        if max_history <= 0:
+            return []
+        if not self.enabled or max_history > self.capacity:
+            return load(max_history)
+
+        with self._lock:
+            ring = self._entries.get(persona_id)
+            if ring is not None:
+                self._entries.move_to_end(persona_id)
+                self.hits += 1
+                return list(ring)[-max_history:]
+            self.misses += 1
+            self._loading[persona_id] = False
+
+        try:
+            messages = load(self.capacity)
+        except BaseException:
+            with self._lock:
+                self._loading.pop(persona_id, None)
+            raise
+
+        with self._lock:
+            # A turn saved mid-load may or may not be in `messages`; skip caching rather than guess
+            if not self._loading.pop(persona_id, True) and persona_id not in self._entries:
+                ring = deque(
+                    (SimpleNamespace(sender=m.sender, message=m.message) for m in messages),
+                    maxlen=self.capacity,
+                )
+                self._entries[persona_id] = ring
+                self._bytes[persona_id] = sum(_size(m) for m in ring)
+                self._total_bytes += self._bytes[persona_id]
+                self._evict()
+        return list(messages)[-max_history:]
+
+    def append(self, persona_id: int, messages: Iterable[Tuple[str, str]]):
+        """Record saved (sender, message) pairs; a persona that is not cached is left for a lazy load."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if persona_id in self._loading:
+                self._loading[persona_id] = True
+            ring = self._entries.get(persona_id)
+            if ring is None:
+                return
+            for sender, message in messages:
+                entry = SimpleNamespace(sender=sender, message=message)
+                if len(ring) == ring.maxlen:
+                    self._resize(persona_id, -_size(ring[0]))
+                ring.append(entry)
+                self._resize(persona_id, _size(entry))
+            self._entries.move_to_end(persona_id)
+            self._evict()
+
+    def invalidate(self, persona_id: int):
+        with self._lock:
+            if persona_id in self._loading:
+                self._loading[persona_id] = True
+            if self._entries.pop(persona_id, None) is not None:
+                self._total_bytes -= self._bytes.pop(persona_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "personas": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _resize(self, persona_id: int, delta: int):
+        self._bytes[persona_id] += delta
+        self._total_bytes += delta
+
+    def _evict(self):
+        # Never evict the entry just touched, even if it alone is over the cap
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            persona_id, _ = self._entries.popitem(last=False)
+            self._total_bytes -= self._bytes.pop(persona_id)
+            self.evictions += 1
+
+
+history_cache = HistoryCache()
@@ -1,15 +1,38 @@
-from fastapi import FastAPI, Form, Depends, HTTPException
+import sys
+from pathlib import Path
+
+# Make the shared Backend/common package importable when run from this directory
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from common.log import RequestIdMiddleware, configure_logging, get_logger
+from fastapi import FastAPI, Form, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional
+from collections import deque
+from types import SimpleNamespace
+import asyncio
+import base64
 import os
+from datetime import datetime
 from dotenv import load_dotenv
 from crewai import LLM, Agent, Task, Crew
 from crewai.tools import BaseTool
 from pydantic import BaseModel
-from models_persona import PersonaFlow, PersonaMessage
-from database_persona import SessionLocal, Base, engine
+from models_persona import PersonaFlow
+from common.db import pool_stats
+from database_persona import SessionLocal, ReadSessionLocal, Base, engine, read_engine, add_missing_columns
+from persona_engine import build_persona_messages, persona_reply, astream_persona_reply
+from summary_jobs import SummaryJobQueue
+from message_writer import message_writer
+from history_cache import history_cache
+from persona_search import persona_search
+from purge_jobs import purge_worker
+from crud_persona import (
+    list_user_characters, get_user_persona, delete_personas, recent_messages, history_page, backfill_message_counts
+)
 from langchain_google_genai import ChatGoogleGenerativeAI
 from models_user import Users
 
@@ -20,6 +43,8 @@ if not GEMINI_KEY:
     raise ValueError("⚠ GEMINI_KEY missing in .env file")
 
 # ================= FASTAPI SETUP =================
+configure_logging("persona-flow")
+logger = get_logger(__name__)
 app = FastAPI(title="Persona Flow Microservice", version="1.1")
 app.add_middleware(
     CORSMiddleware,
@@ -28,8 +53,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"]
 )
+app.add_middleware(RequestIdMiddleware)
 
 Base.metadata.create_all(bind=engine)
+_added_columns = add_missing_columns(PersonaFlow.__table__)
+if "message_count" in _added_columns:
+    with SessionLocal() as _db:
+        backfill_message_counts(_db)
 
 # ================= DATABASE SESSION =================
 def get_db():
@@ -39,6 +69,15 @@ def get_db():
     finally:
         db.close()
 
+
+def get_read_db():
+    # Replica session (the primary when no replica is configured); may lag recent writes
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 # ================= CREWAI SETUP =================
 gemini_llm = LLM(
     model="gemini/gemini-2.5-flash-lite",
@@ -51,17 +90,14 @@ gemini_chat_llm = ChatGoogleGenerativeAI(
     temperature=0.4
 )
 
-# ================= TOOLS =================
-_current_character_summary = ""
-_current_character_name = ""
-
-
-def set_character_context(character_name: str, summary: str):
-    global _current_character_summary, _current_character_name
-    _current_character_summary = summary
-    _current_character_name = character_name
-
+CHAT_ENGINES = ["fast", "agentic"]
+HISTORY_PAGE_SIZE = 100  # page size when only a cursor is given
+HISTORY_PAGE_MAX = 500
+SEARCH_LIMIT_MAX = 100
+SOFT_DELETE = os.getenv("PERSONA_SOFT_DELETE", "false").lower() == "true"  # purge rows in the background
+WS_FLUSH_EVERY = int(os.getenv("PERSONA_WS_FLUSH_EVERY", "6"))  # messages buffered per socket before a save
 
+# ================= TOOLS =================
 class CharacterToolInput(BaseModel):
     query: str
 
@@ -70,19 +106,19 @@ class CharacterTool(BaseTool):
     name: str = "Character Information Tool"
     description: str = "Provides personality and behavior insights."
     args_schema: type[CharacterToolInput] = CharacterToolInput
+    # Bound per request so concurrent chats never share persona context
+    character_name: str = ""
+    character_summary: str = ""
 
     def _run(self, query: str) -> str:
-        if _current_character_summary and _current_character_name:
+        if self.character_summary and self.character_name:
             return (
-                f"Character: {_current_character_name}\n"
-                f"Summary: {_current_character_summary}\n"
+                f"Character: {self.character_name}\n"
+                f"Summary: {self.character_summary}\n"
                 f"Answer for '{query}':"
             )
         return "No active character context."
 
-
-character_tool = CharacterTool()
-
 # ================== CHARACTER SUMMARY ==================
 def generate_character_summary(character_name: str, tone: str) -> str:
     prompt = f"Generate a concise personality profile for {character_name} in {tone} tone."
@@ -90,6 +126,9 @@ def generate_character_summary(character_name: str, tone: str) -> str:
     return response.content
 
 
+summary_jobs = SummaryJobQueue(generate_character_summary)
+
+
 def generate_custom_character_summary(user_prompt: str, tone: str) -> str:
     prompt = f"Create a character based on: '{user_prompt}' with tone {tone}."
     response = gemini_chat_llm.invoke(prompt)
@@ -102,7 +141,7 @@ def create_character_agent(character_name: str, character_summary: str, llm, ton
         role=f"Conversational agent ({tone})",
         goal=f"Reply authentically as {character_name}",
         backstory=character_summary,
-        tools=[character_tool],
+        tools=[CharacterTool(character_name=character_name, character_summary=character_summary)],
         llm=llm,
         verbose=True,
         memory=False,
@@ -111,6 +150,78 @@ def create_character_agent(character_name: str, character_summary: str, llm, ton
     )
 
 
+def agentic_reply(persona: PersonaFlow, history_msgs, user_message: str) -> str:
+    """
+    Opt-in CrewAI path: one Agent/Task/Crew per reply, with a Character tool
+    round-trip. Several LLM calls per reply; the default engine makes one.
+    """
+    context_text = "\n".join(
+        [f"{m.sender}: {m.message}" for m in history_msgs]
+    )
+
+    agent = create_character_agent(
+        persona.character_name, persona.summary, gemini_llm, persona.tone
+    )
+
+    full_prompt = (
+        f"You are {persona.character_name}.\n"
+        f"Your tone: {persona.tone}\n\n"
+        f"Conversation so far:\n{context_text}\n\n"
+        f"Now the user says: {user_message}\n\n"
+        f"Reply as {persona.character_name}, keeping the same tone."
+    )
+
+    task = Task(
+        description=full_prompt,
+        expected_output=f"{persona.tone}-style response from {persona.character_name}",
+        tools=agent.tools,
+        agent=agent
+    )
+
+    crew = Crew(agents=[agent], tasks=[task])
+    result = crew.kickoff()
+
+    response_text = ""
+    if hasattr(result, "raw") and result.raw:
+        response_text = result.raw
+    elif hasattr(result, "output") and result.output:
+        response_text = str(result.output)
+    elif hasattr(result, "results") and len(result.results) > 0:
+        r = result.results[0]
+        response_text = getattr(r, "raw", "") or getattr(r, "output", "")
+    else:
+        response_text = "No valid output from model."
+
+    return response_text.strip()
+
+
+def recent_history(db: Session, persona_id: int, max_history: int):
+    """
+    Last `max_history` messages, oldest first, from the history cache; misses read
+    the database plus whatever the writer has not saved yet.
+    """
+    def load(limit: int):
+        saved = recent_messages(db, persona_id, limit)
+        return (saved + message_writer.pending_for(persona_id, saved))[-limit:]
+
+    return history_cache.recent(persona_id, max_history, load)
+
+
+def save_turns(persona_id: int, messages):
+    message_writer.write(persona_id, messages)
+    history_cache.append(persona_id, messages)
+
+
+def generate_reply(engine: str, persona: PersonaFlow, history_msgs, user_message: str) -> str:
+    """Reply as the persona; `history_msgs` is oldest first."""
+    if engine == "agentic":
+        return agentic_reply(persona, history_msgs, user_message)
+    messages = build_persona_messages(
+        persona.character_name, persona.tone, persona.summary, history_msgs, user_message
+    )
+    return persona_reply(gemini_chat_llm, messages)
+
+
 # ================== ROUTES ==================
 
 @app.get("/get_user_id/{username}")
@@ -158,21 +269,34 @@ def set_character(
         if mode == "custom" and not custom_prompt:
             return JSONResponse(status_code=400, content={"error": "custom_prompt required for custom mode"})
 
+        # Auto mode: reuse a cached profile or generate one in the background
+        cached_profile = summary_jobs.cached_profile(character_name, tone) if mode == "auto" else None
+        if mode == "custom":
+            summary, summary_status = custom_prompt, "ready"
+        elif cached_profile is not None:
+            summary, summary_status = cached_profile, "ready"
+        else:
+            summary, summary_status = "", "pending"
+
         # Create persona
         persona = PersonaFlow(
             user_id=user_id,
             character_name=character_name,  # user-defined
             mode=mode,
             tone=tone,  # user-defined or default
-            summary=custom_prompt if mode == "custom" else "",  # summary empty for auto mode initially
+            summary=summary,
+            summary_status=summary_status,
         )
 
         db.add(persona)
         db.commit()
         db.refresh(persona)
 
+        if summary_status == "pending":
+            summary_jobs.submit(persona.id, persona.character_name, persona.tone)
+
         return {"success": True, "character_id": persona.id, "character_name": persona.character_name,
-                "tone": persona.tone}
+                "tone": persona.tone, "summary_status": persona.summary_status}
 
     except Exception as e:
         db.rollback()
@@ -180,37 +304,36 @@ def set_character(
 
 
 @app.get("/user/{user_id}/characters")
-def get_user_characters(user_id: int, db: Session = Depends(get_db)):
+def get_user_characters(
+        user_id: int,
+        limit: Optional[int] = Query(None, ge=1, le=200),
+        offset: int = Query(0, ge=0),
+        db: Session = Depends(get_db)
+):
     """
-    Get all characters/personas created by a specific user.
+    Get the characters/personas created by a specific user; all of them unless `limit` is given.
     """
     try:
-        personas = (
-            db.query(PersonaFlow)
-            .filter(PersonaFlow.user_id == user_id)
-            .order_by(PersonaFlow.created_at.desc())
-            .all()
-        )
+        total, personas = list_user_characters(db, user_id, limit, offset)
 
         result = []
         for persona in personas:
-            message_count = db.query(PersonaMessage).filter(
-                PersonaMessage.persona_id == persona.id
-            ).count()
-
             result.append({
                 "persona_id": persona.id,
                 "character_name": persona.character_name,
                 "mode": persona.mode,
                 "tone": persona.tone,
                 "summary": persona.summary,
+                "summary_status": persona.summary_status,
                 "created_at": persona.created_at.isoformat(),
-                "message_count": message_count
+                "message_count": persona.message_count
             })
 
         return {
             "user_id": user_id,
-            "total_characters": len(result),
+            "total_characters": total,
+            "limit": limit,
+            "offset": offset,
             "characters": result
         }
 
@@ -220,81 +343,51 @@ def get_user_characters(user_id: int, db: Session = Depends(get_db)):
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
+@app.get("/character/{persona_id}/status")
+def get_character_status(persona_id: int, user_id: int = Query(...), db: Session = Depends(get_db)):
+    """
+    Poll whether a persona's profile summary is ready ('pending', 'ready' or 'failed').
+    """
+    persona = get_user_persona(db, user_id, persona_id)
+    if not persona:
+        return JSONResponse(status_code=404, content={"error": "Persona not found for this user"})
+
+    return {
+        "persona_id": persona.id,
+        "summary_status": persona.summary_status,
+        "summary": persona.summary if persona.summary_status == "ready" else None
+    }
+
+
 @app.post("/chat/")
 def chat(
         user_id: int = Form(...),
         persona_id: int = Form(...),
         user_message: str = Form(...),
         max_history: int = Form(20),
+        engine: str = Form("fast"),  # 'fast' (single LLM call) or 'agentic' (CrewAI)
         db: Session = Depends(get_db)
 ):
     """
     Chat with a specific persona.
     """
+    if engine not in CHAT_ENGINES:
+        return JSONResponse(status_code=400, content={"error": f"Invalid engine. Must be one of {CHAT_ENGINES}."})
     try:
-        persona = (
-            db.query(PersonaFlow)
-            .filter(PersonaFlow.id == persona_id, PersonaFlow.user_id == user_id)
-            .first()
-        )
+        persona = get_user_persona(db, user_id, persona_id)
         if not persona:
             return JSONResponse(status_code=404, content={"error": "Persona not found for this user"})
 
-        history_msgs = (
-            db.query(PersonaMessage)
-            .filter(PersonaMessage.persona_id == persona_id)
-            .order_by(PersonaMessage.created_at.desc())
-            .limit(max_history)
-            .all()
-        )
-
-        context_text = "\n".join(
-            [f"{m.sender}: {m.message}" for m in reversed(history_msgs)]
-        )
-
-        set_character_context(persona.character_name, persona.summary)
-        agent = create_character_agent(
-            persona.character_name, persona.summary, gemini_llm, persona.tone
-        )
-
-        full_prompt = (
-            f"You are {persona.character_name}.\n"
-            f"Your tone: {persona.tone}\n\n"
-            f"Conversation so far:\n{context_text}\n\n"
-            f"Now the user says: {user_message}\n\n"
-            f"Reply as {persona.character_name}, keeping the same tone."
-        )
-
-        task = Task(
-            description=full_prompt,
-            expected_output=f"{persona.tone}-style response from {persona.character_name}",
-            tools=[character_tool],
-            agent=agent
-        )
+        history_msgs = recent_history(db, persona_id, max_history)
 
-        crew = Crew(agents=[agent], tasks=[task])
-        result = crew.kickoff()
-
-        response_text = ""
-        if hasattr(result, "raw") and result.raw:
-            response_text = result.raw
-        elif hasattr(result, "output") and result.output:
-            response_text = str(result.output)
-        elif hasattr(result, "results") and len(result.results) > 0:
-            r = result.results[0]
-            response_text = getattr(r, "raw", "") or getattr(r, "output", "")
-        else:
-            response_text = "No valid output from model."
-
-        response_text = response_text.strip()
+        response_text = generate_reply(engine, persona, history_msgs, user_message)
 
-        db.add(PersonaMessage(persona_id=persona_id, sender="user", message=user_message))
-        db.add(PersonaMessage(persona_id=persona_id, sender="agent", message=response_text))
-        db.commit()
+        save_turns(persona_id, [("user", user_message), ("agent", response_text)])
 
         return {
             "persona_id": persona_id,
             "character_name": persona.character_name,
+            "engine": engine,
             "response": response_text
         }
 
@@ -304,49 +397,216 @@ def chat(
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
+def load_chat_session(user_id: int, persona_id: int, max_history: int):
+    with SessionLocal() as db:
+        persona = get_user_persona(db, user_id, persona_id)
+        if not persona:
+            return None, []
+        db.expunge(persona)
+        history = [SimpleNamespace(sender=m.sender, message=m.message)
+                   for m in recent_history(db, persona_id, max_history)]
+        return persona, history
+
+
+@app.websocket("/ws/chat/{user_id}/{persona_id}")
+async def chat_socket(websocket: WebSocket, user_id: int, persona_id: int, max_history: int = 20):
+    """
+    Streaming persona chat for one (user_id, persona_id) session.
+
+    Client sends {"message": "..."} (or {"type": "cancel"}); server replies with
+    {"type": "token", "text"} events followed by {"type": "done", "response"}.
+    A new message while a reply is streaming cancels it ({"type": "cancelled"}).
+    The persona and recent history are loaded once and kept for the connection;
+    messages are saved every WS_FLUSH_EVERY messages and on disconnect.
+    """
+    await websocket.accept()
+    persona, history = await run_in_threadpool(load_chat_session, user_id, persona_id, max_history)
+    if not persona:
+        await websocket.send_json({"type": "error", "error": "Persona not found for this user"})
+        await websocket.close(code=4404)
+        return
+
+    history = deque(history, maxlen=max_history)
+    unsaved = []
+    reply_task = None
+
+    async def flush():
+        if unsaved:
+            batch = unsaved[:]
+            unsaved.clear()
+            await run_in_threadpool(save_turns, persona_id, batch)
+
+    async def reply(user_message: str):
+        messages = build_persona_messages(
+            persona.character_name, persona.tone, persona.summary, list(history), user_message
+        )
+        # The user's turn is kept even if the reply is cancelled
+        history.append(SimpleNamespace(sender="user", message=user_message))
+        unsaved.append(("user", user_message))
+
+        chunks = []
+        try:
+            async for chunk in astream_persona_reply(gemini_chat_llm, messages):
+                chunks.append(chunk)
+                await websocket.send_json({"type": "token", "text": chunk})
+        except asyncio.CancelledError:
+            await websocket.send_json({"type": "cancelled"})
+            raise
+        except Exception as e:
+            logger.exception("WebSocket chat failed", extra={"persona_id": persona_id})
+            await websocket.send_json({"type": "error", "error": str(e)})
+            return
+
+        response_text = "".join(chunks).strip()
+        history.append(SimpleNamespace(sender="agent", message=response_text))
+        unsaved.append(("agent", response_text))
+        await websocket.send_json({"type": "done", "response": response_text})
+        if len(unsaved) >= WS_FLUSH_EVERY:
+            await flush()
+
+    async def cancel_reply():
+        if reply_task:
+            reply_task.cancel()
+            await asyncio.gather(reply_task, return_exceptions=True)
+
+    await websocket.send_json({
+        "type": "ready",
+        "persona_id": persona_id,
+        "character_name": persona.character_name,
+        "summary_status": persona.summary_status
+    })
+    try:
+        while True:
+            data = await websocket.receive_json()
+            await cancel_reply()
+            if data.get("type") == "cancel":
+                continue
+            user_message = (data.get("message") or "").strip()
+            if not user_message:
+                await websocket.send_json({"type": "error", "error": "Empty message"})
+                continue
+            reply_task = asyncio.create_task(reply(user_message))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await cancel_reply()
+        try:
+            await flush()
+        except Exception:
+            logger.exception("WebSocket save failed", extra={"persona_id": persona_id})
+
+
+def encode_cursor(created_at: datetime, message_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{message_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, message_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(message_id)
+    except Exception:
+        return None
+
+
 @app.get("/history/{user_id}/{persona_id}")
-def get_history(user_id: int, persona_id: int, db: Session = Depends(get_db)):
+def get_history(
+        user_id: int,
+        persona_id: int,
+        limit: Optional[int] = Query(None, ge=1, le=HISTORY_PAGE_MAX),
+        cursor: Optional[str] = None,
+        db: Session = Depends(get_read_db)
+):
     """
-    Fetch chat history for a persona.
+    Fetch chat history for a persona, oldest first. Without `limit` or `cursor` this is
+    the whole transcript. With `limit` it is the latest `limit` messages; pass
+    `next_cursor` back as `cursor` for older ones.
     """
+    before = decode_cursor(cursor) if cursor else None
+    if cursor and not before:
+        return JSONResponse(status_code=400, content={"error": "Invalid cursor"})
     try:
-        persona = (
-            db.query(PersonaFlow)
-            .filter(PersonaFlow.id == persona_id, PersonaFlow.user_id == user_id)
-            .first()
-        )
+        persona = get_user_persona(db, user_id, persona_id)
 
         if not persona:
             return JSONResponse(status_code=404, content={"error": "Persona not found for this user"})
 
-        msgs = (
-            db.query(PersonaMessage)
-            .filter(PersonaMessage.persona_id == persona_id)
-            .order_by(PersonaMessage.created_at.asc())
-            .all()
-        )
+        if cursor and limit is None:
+            limit = HISTORY_PAGE_SIZE
+        msgs, has_more = history_page(db, persona_id, limit, before)
+        messages = [
+            {
+                "sender": m.sender,
+                "message": m.message,
+                "created_at": m.created_at.isoformat()
+            }
+            for m in msgs
+        ]
+        pending = message_writer.pending_for(persona_id, msgs)
+        if not cursor:
+            # Turns still queued by the write-behind writer belong at the end of the newest page
+            messages += [{"sender": m.sender, "message": m.message, "created_at": m.created_at.isoformat()}
+                         for m in pending]
 
         return {
             "persona_id": persona_id,
             "character_name": persona.character_name,
             "user_id": user_id,
-            "message_count": len(msgs),
-            "messages": [
+            "message_count": persona.message_count + len(pending),
+            "messages": messages,
+            "next_cursor": encode_cursor(msgs[0].created_at, msgs[0].id) if has_more else None
+        }
+
+    except Exception as e:
+        logger.exception("Get history failed", extra={"user_id": user_id, "persona_id": persona_id})
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+@app.get("/search/{user_id}")
+def search_messages(
+        user_id: int,
+        q: str = Query(..., min_length=1, max_length=200),
+        persona_id: Optional[int] = None,
+        limit: int = Query(20, ge=1, le=SEARCH_LIMIT_MAX),
+        db: Session = Depends(get_read_db)
+):
+    """
+    Full-text search over the user's messages, across all personas or one of them.
+    """
+    try:
+        rows = persona_search.search(db, user_id, q, persona_id, limit)
+        return {
+            "user_id": user_id,
+            "query": q,
+            "backend": persona_search.backend,
+            "results": [
                 {
-                    "sender": m.sender,
-                    "message": m.message,
-                    "created_at": m.created_at.isoformat()
+                    "message_id": row.id,
+                    "persona_id": row.persona_id,
+                    "character_name": row.character_name,
+                    "sender": row.sender,
+                    "message": row.message,
+                    "created_at": row.created_at.isoformat()
                 }
-                for m in msgs
+                for row in rows
             ]
         }
 
     except Exception as e:
-        import traceback
-        print("❌ Get History Error:", traceback.format_exc())
+        logger.exception("Message search failed", extra={"user_id": user_id, "persona_id": persona_id})
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
+def remove_personas(db: Session, user_id: int, persona_ids: Optional[List[int]] = None):
+    """Delete personas (soft or hard per PERSONA_SOFT_DELETE) and drop their in-process state."""
+    deleted = delete_personas(db, user_id, persona_ids, soft=SOFT_DELETE)
+    for persona_id, _ in deleted:
+        message_writer.drop(persona_id)
+        history_cache.invalidate(persona_id)
+    if deleted and SOFT_DELETE:
+        purge_worker.notify()
+    return deleted
+
+
 @app.delete("/character/{persona_id}")
 def delete_character(
         persona_id: int,
@@ -357,18 +617,12 @@ def delete_character(
     Delete a persona and its messages.
     """
     try:
-        persona = (
-            db.query(PersonaFlow)
-            .filter(PersonaFlow.id == persona_id, PersonaFlow.user_id == user_id)
-            .first()
-        )
+        deleted = remove_personas(db, user_id, [persona_id])
 
-        if not persona:
+        if not deleted:
             return JSONResponse(status_code=404, content={"error": "Character not found or access denied"})
 
-        character_name = persona.character_name
-        db.delete(persona)
-        db.commit()
+        character_name = deleted[0][1]
 
         return {
             "success": True,
@@ -382,10 +636,95 @@ def delete_character(
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
+@app.delete("/characters")
+def delete_characters(
+        user_id: int = Form(...),
+        persona_ids: List[int] = Form(...),
+        db: Session = Depends(get_db)
+):
+    """
+    Delete several personas and their messages in one request.
+    """
+    try:
+        deleted_ids = [persona_id for persona_id, _ in remove_personas(db, user_id, persona_ids)]
+        return {
+            "success": True,
+            "deleted_persona_ids": deleted_ids,
+            "not_found": [persona_id for persona_id in persona_ids if persona_id not in deleted_ids]
+        }
+
+    except Exception as e:
+        logger.exception("Bulk persona delete failed", extra={"user_id": user_id, "persona_ids": persona_ids})
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+@app.delete("/user/{user_id}/data")
+def delete_user_data(user_id: int, db: Session = Depends(get_db)):
+    """
+    Delete all of a user's personas and messages.
+    """
+    try:
+        deleted = remove_personas(db, user_id)
+        return {
+            "success": True,
+            "user_id": user_id,
+            "deleted_characters": len(deleted)
+        }
+
+    except Exception as e:
+        logger.exception("User data delete failed", extra={"user_id": user_id})
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+@app.on_event("startup")
+def resume_summary_jobs():
+    summary_jobs.resume_pending()
+
+
+@app.on_event("startup")
+def setup_search():
+    persona_search.setup(engine)
+
+
+@app.on_event("startup")
+def start_message_writer():
+    message_writer.start()
+
+
+@app.on_event("startup")
+def start_purge_worker():
+    purge_worker.start()
+
+
+@app.on_event("shutdown")
+def stop_summary_jobs():
+    summary_jobs.shutdown()
+
+
+@app.on_event("shutdown")
+def stop_purge_worker():
+    purge_worker.stop()
+
+
+@app.on_event("shutdown")
+def stop_message_writer():
+    # Flushes whatever is still queued
+    message_writer.stop()
+
+
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "persona-microservice"}
+    return {
+        "status": "healthy",
+        "service": "persona-microservice",
+        "message_writer": message_writer.stats(),
+        "history_cache": history_cache.stats(),
+        "db": {
+            "primary": pool_stats(engine),
+            "replica": pool_stats(read_engine) if read_engine is not engine else None
+        }
+    }
 
 
 if __name__ == "__main__":
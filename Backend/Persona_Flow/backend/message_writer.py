@@ -0,0 +1,302 @@
+import glob
+import json
+import os
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from common.log import get_logger
+from crud_persona import save_message_rows
+from database_persona import SessionLocal
+from models_persona import PersonaFlow
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = get_logger(__name__)
+
+WRITE_BEHIND = os.getenv("PERSONA_WRITE_BEHIND", "false").lower() == "true"
+WRITE_BATCH_SIZE = int(os.getenv("PERSONA_WRITE_BATCH_SIZE", "200"))
+WRITE_INTERVAL_S = float(os.getenv("PERSONA_WRITE_INTERVAL_S", "0.5"))
+WRITE_MAX_ATTEMPTS = int(os.getenv("PERSONA_WRITE_MAX_ATTEMPTS", "3"))  # before a failing row is set aside
+WAL_PATH = os.getenv("PERSONA_WAL_PATH", "")  # empty disables the WAL
+WAL_FSYNC = os.getenv("PERSONA_WAL_FSYNC", "false").lower() == "true"
+# Rows that kept failing are appended here as JSON lines; empty only logs them
+REJECTED_PATH = os.getenv("PERSONA_REJECTED_PATH", f"{WAL_PATH}.rejected" if WAL_PATH else "")
+
+# Errors that mean the database is unreachable rather than that a row is bad
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+ROW_COLUMNS = ("persona_id", "sender", "message", "created_at")
+
+
+class MessageWriter:
+    """
+    Saves PersonaMessage rows, either synchronously or write-behind.
+
+    In write-behind mode write() only queues the rows (and appends them to the
+    WAL file, if configured); a background thread bulk-inserts the queue every
+    `interval` seconds or as soon as `batch_size` rows are waiting. The WAL is
+    replayed on start() and rewritten to the still-unsaved rows after every
+    flush, so a crash loses nothing but may save a batch twice if it happens
+    between the commit and the rewrite.
+
+    Each process writes its own WAL, `<wal_path>.<pid>`, locked while it runs;
+    start() also takes over the WALs of processes that have exited, so several
+    uvicorn workers can share one PERSONA_WAL_PATH. Without fcntl (Windows) the
+    plain path is used and only a single worker is supported.
+
+    If a batch fails for any reason but a lost connection, its rows are retried
+    one by one; a row that fails `max_attempts` times is set aside in
+    REJECTED_PATH so it cannot hold up the rows queued behind it.
+
+    Queued rows are stamped with created_at (UTC, whole seconds like the
+    database default) when they are written, and saved with that timestamp.
+    """
+
+    def __init__(self, enabled: bool = WRITE_BEHIND, batch_size: int = WRITE_BATCH_SIZE,
+                 interval: float = WRITE_INTERVAL_S, wal_path: str = WAL_PATH,
+                 max_attempts: int = WRITE_MAX_ATTEMPTS, rejected_path: str = REJECTED_PATH):
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.interval = interval
+        self.wal_path = wal_path
+        self.max_attempts = max_attempts
+        self.rejected_path = rejected_path
+        self._cond = threading.Condition()
+        self._queue: List[Dict] = []
+        self._inflight: List[Dict] = []
+        self._wal = None
+        self._thread = None
+        self._stopping = False
+        self.flushed = 0
+        self.failed_flushes = 0
+        self.rejected = 0
+
+    def write(self, persona_id: int, messages: Iterable[Tuple[str, str]]):
+        rows = [{"persona_id": persona_id, "sender": sender, "message": message} for sender, message in messages]
+        if not self.enabled:
+            with SessionLocal() as db:
+                save_message_rows(db, rows)
+            return
+
+        created_at = datetime.utcnow().replace(microsecond=0)
+        for row in rows:
+            row["created_at"] = created_at
+        with self._cond:
+            if self._wal:
+                self._wal.writelines(_wal_line(row) for row in rows)
+                self._wal.flush()
+                if WAL_FSYNC:
+                    os.fsync(self._wal.fileno())
+            self._queue.extend(rows)
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+
+    def pending_for(self, persona_id: int, saved: Iterable = ()) -> List[SimpleNamespace]:
+        """
+        Messages (sender, message, created_at) of this persona not yet committed,
+        oldest first. `saved` are messages just read from the database: a batch
+        committed since that read is still in flight here, so rows already among
+        them, by (sender, message, created_at), are left out instead of repeated.
+        """
+        seen = {(m.sender, m.message, m.created_at) for m in saved}
+        with self._cond:
+            inflight = [row for row in self._inflight
+                        if (row["sender"], row["message"], row["created_at"]) not in seen]
+            return [SimpleNamespace(sender=row["sender"], message=row["message"], created_at=row["created_at"])
+                    for row in inflight + self._queue if row["persona_id"] == persona_id]
+
+    def drop(self, persona_id: int):
+        """Forget queued rows of a deleted persona."""
+        with self._cond:
+            self._queue = [row for row in self._queue if row["persona_id"] != persona_id]
+
+    def start(self):
+        if not self.enabled or self._thread:
+            return
+        if self.wal_path:
+            self._open_wal()
+        self._thread = threading.Thread(target=self._run, name="persona-message-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._thread:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join()
+        self._thread = None
+        if self._wal:
+            self._wal.close()
+            self._wal = None
+
+    def stats(self) -> dict:
+        with self._cond:
+            queued = len(self._queue) + len(self._inflight)
+        return {
+            "write_behind": self.enabled,
+            "queued": queued,
+            "flushed": self.flushed,
+            "failed_flushes": self.failed_flushes,
+            "rejected": self.rejected,
+        }
+
+    def _open_wal(self):
+        path = f"{self.wal_path}.{os.getpid()}" if fcntl else self.wal_path
+        self._wal = open(path, "a+", encoding="utf-8")
+        if fcntl:
+            fcntl.flock(self._wal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        # Our own file may hold rows from an earlier process with the same pid
+        self._wal.seek(0)
+        replayed = _read_wal(self._wal)
+        claimed = self._claim_orphaned_wals(path)
+        for _, f in claimed:
+            replayed += _read_wal(f)
+
+        with self._cond:
+            self._queue = replayed + self._queue
+            # Keep the replayed rows durable in our WAL before the old files go away
+            self._rewrite_wal()
+        for orphan, f in claimed:
+            os.unlink(orphan)
+            f.close()
+        if replayed:
+            logger.info("Replaying persona message WAL", extra={"rows": len(replayed), "files": len(claimed) + 1})
+
+    def _claim_orphaned_wals(self, own_path: str) -> list:
+        """Lock and return the WALs of exited processes (plus a pre-pid plain WAL file)."""
+        if not fcntl:
+            return []
+        candidates = [self.wal_path] + [
+            path for path in glob.glob(f"{glob.escape(self.wal_path)}.*")
+            if path.rsplit(".", 1)[-1].isdigit()
+        ]
+        claimed = []
+        for path in candidates:
+            if path == own_path:
+                continue
+            try:
+                f = open(path, "r", encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                f.close()  # a running worker's WAL
+                continue
+            if os.fstat(f.fileno()).st_nlink == 0:
+                f.close()  # another worker replayed and removed it meanwhile
+                continue
+            claimed.append((path, f))
+        return claimed
+
+    def _rewrite_wal(self):
+        if self._wal:
+            self._wal.seek(0)
+            self._wal.truncate()
+            self._wal.writelines(_wal_line(row) for row in self._queue)
+            self._wal.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._queue) < self.batch_size:
+                    self._cond.wait(self.interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def flush(self):
+        with self._cond:
+            if self._inflight or not self._queue:
+                return
+            self._inflight, self._queue = self._queue, []
+        batch = self._inflight
+
+        retry, rejected = [], []
+        try:
+            _save(batch)
+        except TRANSIENT_ERRORS:
+            self.failed_flushes += 1
+            logger.exception("Persona message flush failed", extra={"rows": len(batch)})
+            retry = batch
+        except Exception:
+            self.failed_flushes += 1
+            logger.exception("Persona message flush failed; saving rows one by one", extra={"rows": len(batch)})
+            retry, rejected = self._save_each(batch)
+
+        if rejected:
+            self._reject(rejected)
+        with self._cond:
+            self._inflight = []
+            self._queue = retry + self._queue
+            self.flushed += len(batch) - len(retry) - len(rejected)
+            self.rejected += len(rejected)
+            self._rewrite_wal()
+
+    def _save_each(self, batch: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """Save rows individually; returns (rows to retry, rows to set aside)."""
+        retry, rejected = [], []
+        for row in batch:
+            try:
+                _save([row])
+            except TRANSIENT_ERRORS:
+                retry.append(row)
+            except Exception as e:
+                row["attempts"] = row.get("attempts", 0) + 1
+                row["error"] = str(e)[:300]
+                (rejected if row["attempts"] >= self.max_attempts else retry).append(row)
+        return retry, rejected
+
+    def _reject(self, rows: List[Dict]):
+        logger.error(
+            "Setting aside persona messages that keep failing to save",
+            extra={"rows": len(rows), "persona_ids": sorted({row["persona_id"] for row in rows}),
+                   "path": self.rejected_path or None, "error": rows[0]["error"]},
+        )
+        if self.rejected_path:
+            with open(self.rejected_path, "a", encoding="utf-8") as f:
+                f.writelines(_wal_line(row) for row in rows)
+
+
+def _save(rows: List[Dict]):
+    with SessionLocal() as db:
+        live = set(db.scalars(
+            select(PersonaFlow.id).where(
+                PersonaFlow.id.in_({row["persona_id"] for row in rows}),
+                PersonaFlow.deleted_at.is_(None)
+            )
+        ))
+        # Rows of personas deleted since they were queued would fail the foreign key or be orphaned
+        save_message_rows(db, [{key: row[key] for key in ROW_COLUMNS} for row in rows if row["persona_id"] in live])
+
+
+def _read_wal(f) -> List[Dict]:
+    rows = []
+    for line in f:
+        try:
+            row = json.loads(line)
+            row["created_at"] = (
+                datetime.fromisoformat(row["created_at"]) if row.get("created_at")
+                else datetime.utcnow().replace(microsecond=0)
+            )
+            rows.append(row)
+        except ValueError:
+            # Torn last line from a crash mid-write
+            logger.warning("Skipping unreadable WAL line")
+    return rows
+
+
+def _wal_line(row: Dict) -> str:
+    return json.dumps({**row, "created_at": row["created_at"].isoformat()}) + "\n"
+
+
+message_writer = MessageWriter()
@@ -1,9 +1,17 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship
 from database_persona import Base
 from datetime import datetime
 from sqlalchemy.sql import func
 
+# SQLite keeps datetimes as text and CURRENT_TIMESTAMP has no fraction; store bound values
+# the same way so they compare equal to defaulted ones (history cursors rely on it)
+MessageTimestamp = DateTime().with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
+
 
 class PersonaFlow(Base):
     __tablename__ = "persona_flow"
@@ -14,13 +22,20 @@ class PersonaFlow(Base):
     mode = Column(String(10), nullable=False)  # 'auto' or 'custom'
     tone = Column(String(50), default="neutral", nullable=False)
     summary = Column(Text, nullable=False)
+    # Denormalized count of persona_messages rows, kept in step by save_message_rows()
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Auto-mode summaries are generated in the background: 'pending' -> 'ready' | 'failed'
+    summary_status = Column(String(10), nullable=False, default="ready", server_default="ready")
     created_at = Column(DateTime, server_default=func.current_timestamp(), nullable=False)
+    # Set by soft deletes; the purge job removes the persona and its messages later
+    deleted_at = Column(DateTime, nullable=True)
 
-    # Relationship to messages (cascade delete)
+    # Relationship to messages (cascade delete, left to the FK's ON DELETE CASCADE)
     messages = relationship(
         "PersonaMessage",
         back_populates="persona",
         cascade="all, delete-orphan",
+        passive_deletes=True,
         lazy="dynamic"  # Better performance for counting
     )
 
@@ -40,7 +55,7 @@ class PersonaMessage(Base):
     persona_id = Column(Integer, ForeignKey("persona_flow.id", ondelete="CASCADE"), nullable=False, index=True)
     sender = Column(String(10), nullable=False)  # 'user' or 'agent'
     message = Column(Text, nullable=False)
-    created_at = Column(DateTime, server_default=func.current_timestamp(), nullable=False)
+    created_at = Column(MessageTimestamp, server_default=func.current_timestamp(), nullable=False)
 
     # Relationship back to persona
     persona = relationship("PersonaFlow", back_populates="messages")
@@ -51,4 +66,22 @@ class PersonaMessage(Base):
     )
 
     def __repr__(self):
-        return f"<PersonaMessage(id={self.id}, persona_id={self.persona_id}, sender='{self.sender}')>"
\ No newline at end of file
+        return f"<PersonaMessage(id={self.id}, persona_id={self.persona_id}, sender='{self.sender}')>"
+
+
+class PersonaProfile(Base):
+    """Generated auto-mode profiles shared by every user who picks the same character and tone."""
+    __tablename__ = "persona_profiles"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    name_key = Column(String(100), nullable=False)  # normalized character name
+    tone_key = Column(String(50), nullable=False)  # normalized tone
+    summary = Column(Text, nullable=False)
+    created_at = Column(DateTime, server_default=func.current_timestamp(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('name_key', 'tone_key', name='uq_profile_name_tone'),
+    )
+
+    def __repr__(self):
+        return f"<PersonaProfile(id={self.id}, name_key='{self.name_key}', tone_key='{self.tone_key}')>"
@@ -1,14 +1,5 @@
 # models_user.py
-from sqlalchemy import Column, Integer, String
-from database_persona import Base
+from common.db import User
 
-class Users(Base):
-    __tablename__ = "users"  # Must match your main user table name
-
-    # Ensure MySQL will auto-increment this primary key
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    username = Column(String(100), unique=True, nullable=False)
-    hashed_password = Column(String(255), nullable=False)
-
-    def __repr__(self):
-        return f"<Users(id={self.id}, username='{self.username}')>"
+# The users table is mapped once, in the shared package; Users is kept for existing imports
+Users = User
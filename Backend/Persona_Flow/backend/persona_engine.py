@@ -0,0 +1,43 @@
+from typing import AsyncIterator, Iterable, List
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+PERSONA_SYSTEM_PROMPT = """You are {character_name}. Stay in character for the whole conversation.
+Your tone: {tone}
+
+Character profile:
+{summary}
+
+Reply as {character_name} would, keeping the same tone. Do not mention that you are an AI model
+or that you are playing a role."""
+
+
+def build_persona_messages(character_name: str, tone: str, summary: str,
+                           history: Iterable, user_message: str) -> List:
+    """
+    Render the persona system prompt, the recent history (oldest first, objects with
+    `sender` and `message`) and the new user message as chat messages.
+    """
+    messages = [SystemMessage(content=PERSONA_SYSTEM_PROMPT.format(
+        character_name=character_name,
+        tone=tone,
+        summary=summary or "No profile available; rely on what you know about this character.",
+    ))]
+    for m in history:
+        if m.sender == "user":
+            messages.append(HumanMessage(content=m.message))
+        else:
+            messages.append(AIMessage(content=m.message))
+    messages.append(HumanMessage(content=user_message))
+    return messages
+
+
+def persona_reply(llm, messages: List) -> str:
+    """Single streaming LLM call, joined into the full reply."""
+    return "".join(chunk.content for chunk in llm.stream(messages)).strip()
+
+
+async def astream_persona_reply(llm, messages: List) -> AsyncIterator[str]:
+    async for chunk in llm.astream(messages):
+        if chunk.content:
+            yield chunk.content
@@ -0,0 +1,180 @@
+import os
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import column, inspect, select, table, text
+from sqlalchemy.orm import Session
+
+from common.log import get_logger
+from models_persona import PersonaFlow, PersonaMessage
+
+logger = get_logger(__name__)
+
+SEARCH_BACKEND = os.getenv("PERSONA_SEARCH_BACKEND", "auto")  # auto | mysql | fts5 | memory
+FULLTEXT_INDEX = "ftx_persona_message"
+FTS_TABLE = "persona_messages_fts"
+MEMORY_BATCH = 10000
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(query: str) -> List[str]:
+    return [token.lower() for token in _TOKEN.findall(query)]
+
+
+def result_select(user_id: int, persona_id: Optional[int] = None):
+    stmt = (
+        select(
+            PersonaMessage.id, PersonaMessage.persona_id, PersonaMessage.sender,
+            PersonaMessage.message, PersonaMessage.created_at, PersonaFlow.character_name
+        )
+        .join(PersonaFlow, PersonaFlow.id == PersonaMessage.persona_id)
+        .where(PersonaFlow.user_id == user_id, PersonaFlow.deleted_at.is_(None))
+    )
+    if persona_id is not None:
+        stmt = stmt.where(PersonaMessage.persona_id == persona_id)
+    return stmt
+
+
+class InvertedIndex:
+    """
+    In-process token -> message id index, for databases without a full-text index.
+
+    It catches up incrementally (messages with ids above the last indexed one)
+    before every search; results are re-read from the database, so postings of
+    deleted messages are simply never returned.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._indexed_until = 0
+
+    def refresh(self, db: Session):
+        with self._lock:
+            while True:
+                rows = db.execute(
+                    select(PersonaMessage.id, PersonaMessage.message)
+                    .where(PersonaMessage.id > self._indexed_until)
+                    .order_by(PersonaMessage.id)
+                    .limit(MEMORY_BATCH)
+                ).all()
+                for message_id, message in rows:
+                    for token in set(tokenize(message)):
+                        self._postings[token].add(message_id)
+                if rows:
+                    self._indexed_until = rows[-1].id
+                if len(rows) < MEMORY_BATCH:
+                    return
+
+    def candidates(self, terms: List[str]) -> List[int]:
+        """Ids of messages containing every term, newest first."""
+        with self._lock:
+            postings = sorted((self._postings.get(term, set()) for term in terms), key=len)
+            matched = set.intersection(*postings) if postings else set()
+        return sorted(matched, reverse=True)
+
+
+class PersonaSearch:
+    """
+    Full-text search over PersonaMessage.message.
+
+    Uses a MySQL FULLTEXT index (ranked by relevance), an SQLite FTS5 table kept
+    in sync by triggers (ranked by bm25), or, for other databases, an in-process
+    inverted index (all terms must match, newest first).
+    """
+
+    def __init__(self, backend: str = SEARCH_BACKEND):
+        self.requested = backend
+        self.backend = None
+        self._memory = InvertedIndex()
+
+    def setup(self, engine):
+        """Pick the backend for `engine` and create its index if missing."""
+        dialect = engine.dialect.name
+        backend = self.requested
+        if backend == "auto":
+            backend = {"mysql": "mysql", "sqlite": "fts5"}.get(dialect, "memory")
+
+        try:
+            if backend == "mysql":
+                self._ensure_fulltext(engine)
+            elif backend == "fts5":
+                self._ensure_fts5(engine)
+        except Exception:
+            logger.exception("Full-text index setup failed; using the in-process index", extra={"backend": backend})
+            backend = "memory"
+        self.backend = backend
+        logger.info("Persona search ready", extra={"backend": backend})
+
+    def _ensure_fulltext(self, engine):
+        indexes = {ix["name"] for ix in inspect(engine).get_indexes(PersonaMessage.__tablename__)}
+        if FULLTEXT_INDEX not in indexes:
+            # One-off build; InnoDB keeps it current on every insert/delete afterwards
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"ALTER TABLE {PersonaMessage.__tablename__} ADD FULLTEXT INDEX {FULLTEXT_INDEX} (message)"
+                ))
+
+    def _ensure_fts5(self, engine):
+        messages = PersonaMessage.__tablename__
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+            ).first()
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                f"USING fts5(message, content='{messages}', content_rowid='id')"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {messages} BEGIN "
+                f"INSERT INTO {FTS_TABLE}(rowid, message) VALUES (new.id, new.message); END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {messages} BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, message) VALUES ('delete', old.id, old.message); END"
+            ))
+            if not exists:
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+    def search(self, db: Session, user_id: int, query: str,
+               persona_id: Optional[int] = None, limit: int = 20) -> list:
+        terms = tokenize(query)
+        if not terms:
+            return []
+        stmt = result_select(user_id, persona_id)
+
+        if self.backend == "mysql":
+            from sqlalchemy.dialects.mysql import match
+
+            score = match(PersonaMessage.message, against=query).in_natural_language_mode()
+            return db.execute(stmt.where(score).order_by(score.desc()).limit(limit)).all()
+
+        if self.backend == "fts5":
+            fts = table(FTS_TABLE, column("rowid"), column("rank"))
+            # Quote every term so user input is never parsed as FTS5 query syntax
+            fts_query = " ".join(f'"{term}"' for term in terms)
+            return db.execute(
+                stmt.join(fts, fts.c.rowid == PersonaMessage.id)
+                .where(text(f"{FTS_TABLE} MATCH :fts_query").bindparams(fts_query=fts_query))
+                .order_by(fts.c.rank)
+                .limit(limit)
+            ).all()
+
+        self._memory.refresh(db)
+        candidates = self._memory.candidates(terms)
+        results = []
+        # Candidates span every user; keep reading batches until the page is full
+        for start in range(0, len(candidates), 500):
+            batch = candidates[start:start + 500]
+            results += db.execute(
+                stmt.where(PersonaMessage.id.in_(batch)).order_by(PersonaMessage.id.desc())
+            ).all()
+            if len(results) >= limit:
+                break
+        return results[:limit]
+
+
+persona_search = PersonaSearch()
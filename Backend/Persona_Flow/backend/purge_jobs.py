@@ -0,0 +1,65 @@
+import os
+import threading
+
+from common.log import get_logger
+from crud_persona import purge_deleted
+from database_persona import SessionLocal
+
+logger = get_logger(__name__)
+
+PURGE_BATCH_SIZE = int(os.getenv("PERSONA_PURGE_BATCH", "5000"))
+PURGE_INTERVAL_S = float(os.getenv("PERSONA_PURGE_INTERVAL_S", "60"))
+
+
+class PurgeWorker:
+    """
+    Background thread that hard-deletes soft-deleted personas in small batches.
+
+    Runs when notify()'d after a soft delete and every `interval` seconds, which
+    also picks up personas left over by a previous process.
+    """
+
+    def __init__(self, batch_size: int = PURGE_BATCH_SIZE, interval: float = PURGE_INTERVAL_S):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self.purged_rows = 0
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="persona-purge", daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        self._wake.set()
+
+    def stop(self):
+        if not self._thread:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                self._drain()
+            except Exception:
+                logger.exception("Persona purge failed")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _drain(self):
+        while not self._stopping:
+            with SessionLocal() as db:
+                deleted = purge_deleted(db, self.batch_size)
+            if not deleted:
+                return
+            self.purged_rows += deleted
+
+
+purge_worker = PurgeWorker()
@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from common.log import get_logger
+from database_persona import SessionLocal
+from models_persona import PersonaFlow, PersonaProfile
+
+logger = get_logger(__name__)
+
+SUMMARY_WORKERS = int(os.getenv("PERSONA_SUMMARY_WORKERS", "4"))
+SUMMARY_SAVE_ATTEMPTS = int(os.getenv("PERSONA_SUMMARY_SAVE_ATTEMPTS", "3"))
+SUMMARY_SAVE_BACKOFF_S = float(os.getenv("PERSONA_SUMMARY_SAVE_BACKOFF_S", "1"))
+
+
+def profile_key(character_name: str, tone: str) -> Tuple[str, str]:
+    return " ".join(character_name.lower().split())[:100], " ".join(tone.lower().split())[:50]
+
+
+class SummaryJobQueue:
+    """
+    Generates auto-mode persona summaries off the request path.
+
+    Profiles are cached per normalized (character_name, tone), in memory and in the
+    persona_profiles table, so a popular character is generated once for everyone.
+    Concurrent requests for the same key share one in-flight generation.
+    """
+
+    def __init__(self, generate: Callable[[str, str], str], workers: int = SUMMARY_WORKERS):
+        self._generate = generate
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="persona-summary")
+        self._lock = threading.Lock()
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self._profiles: Dict[Tuple[str, str], str] = {}
+
+    def cached_profile(self, character_name: str, tone: str):
+        return self._profiles.get(profile_key(character_name, tone))
+
+    def submit(self, persona_id: int, character_name: str, tone: str):
+        key = profile_key(character_name, tone)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._executor.submit(self._resolve, key, character_name, tone)
+                self._inflight[key] = future
+        # Saved on a worker: the callback runs in this (request) thread if the future is already done
+        future.add_done_callback(lambda f: self._schedule_apply(persona_id, f))
+
+    def _schedule_apply(self, persona_id: int, future: Future):
+        try:
+            self._executor.submit(self._apply, persona_id, future)
+        except RuntimeError:
+            # Shutting down; the persona stays 'pending' and resume_pending() picks it up next start
+            pass
+
+    def _resolve(self, key: Tuple[str, str], character_name: str, tone: str) -> str:
+        try:
+            if key in self._profiles:
+                return self._profiles[key]
+
+            with SessionLocal() as db:
+                summary = db.scalar(
+                    select(PersonaProfile.summary)
+                    .where(PersonaProfile.name_key == key[0], PersonaProfile.tone_key == key[1])
+                )
+                if summary is None:
+                    summary = self._generate(character_name, tone)
+                    db.add(PersonaProfile(name_key=key[0], tone_key=key[1], summary=summary))
+                    try:
+                        db.commit()
+                    except IntegrityError:
+                        # Another worker process stored the same profile first
+                        db.rollback()
+
+            self._profiles[key] = summary
+            return summary
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _apply(self, persona_id: int, future: Future):
+        try:
+            values = {"summary": future.result(), "summary_status": "ready"}
+        except Exception:
+            logger.exception("Persona summary generation failed", extra={"persona_id": persona_id})
+            values = {"summary_status": "failed"}
+
+        for attempt in range(1, SUMMARY_SAVE_ATTEMPTS + 1):
+            try:
+                self._update(persona_id, values)
+                return
+            except Exception:
+                logger.exception("Saving persona summary failed", extra={"persona_id": persona_id, "attempt": attempt})
+                if attempt < SUMMARY_SAVE_ATTEMPTS:
+                    time.sleep(SUMMARY_SAVE_BACKOFF_S * attempt)
+
+        if values["summary_status"] != "failed":
+            # The summary itself may be what the database rejects; at least stop reporting 'pending'
+            try:
+                self._update(persona_id, {"summary_status": "failed"})
+            except Exception:
+                logger.exception("Could not mark persona summary failed", extra={"persona_id": persona_id})
+
+    def _update(self, persona_id: int, values: dict):
+        with SessionLocal() as db:
+            db.execute(update(PersonaFlow).where(PersonaFlow.id == persona_id).values(**values))
+            db.commit()
+
+    def resume_pending(self):
+        """Re-queue personas left 'pending' by a previous process."""
+        with SessionLocal() as db:
+            pending = db.execute(
+                select(PersonaFlow.id, PersonaFlow.character_name, PersonaFlow.tone)
+                .where(PersonaFlow.summary_status == "pending", PersonaFlow.deleted_at.is_(None))
+            ).all()
+        for persona_id, character_name, tone in pending:
+            self.submit(persona_id, character_name, tone)
+        return len(pending)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
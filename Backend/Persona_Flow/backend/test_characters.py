@@ -0,0 +1,20 @@
+def test_characters_unpaged_returns_every_persona(client, user_id, make_persona):
+    ids = [make_persona(user_id, name=f"Persona {n}") for n in range(60)]
+
+    body = client.get(f"/user/{user_id}/characters").json()
+
+    assert body["total_characters"] == 60
+    assert sorted(c["persona_id"] for c in body["characters"]) == sorted(ids)
+
+
+def test_characters_paged_when_limit_given(client, user_id, make_persona):
+    for n in range(5):
+        make_persona(user_id, name=f"Persona {n}")
+
+    first = client.get(f"/user/{user_id}/characters", params={"limit": 2}).json()
+    rest = client.get(f"/user/{user_id}/characters", params={"limit": 2, "offset": 2}).json()
+    past_end = client.get(f"/user/{user_id}/characters", params={"limit": 2, "offset": 10}).json()
+
+    assert len(first["characters"]) == 2 and first["total_characters"] == 5
+    assert {c["persona_id"] for c in first["characters"]}.isdisjoint(c["persona_id"] for c in rest["characters"])
+    assert past_end["characters"] == [] and past_end["total_characters"] == 5
@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import pytest
+
+from crud_persona import save_message_rows
+from database_persona import SessionLocal
+from message_writer import message_writer
+
+
+def add_messages(persona_id: int, count: int, prefix: str = "message"):
+    with SessionLocal() as db:
+        save_message_rows(db, [
+            {"persona_id": persona_id, "sender": "user" if i % 2 == 0 else "agent", "message": f"{prefix} {i}"}
+            for i in range(count)
+        ])
+
+
+@pytest.fixture
+def write_behind(monkeypatch):
+    # Queue rows without starting the background thread; tests flush by hand
+    monkeypatch.setattr(message_writer, "enabled", True)
+    yield message_writer
+    message_writer.flush()
+
+
+def test_history_without_paging_returns_whole_transcript(client, user_id, make_persona):
+    persona_id = make_persona(user_id)
+    add_messages(persona_id, 250)
+
+    body = client.get(f"/history/{user_id}/{persona_id}").json()
+
+    assert [m["message"] for m in body["messages"]] == [f"message {i}" for i in range(250)]
+    assert body["message_count"] == 250
+    assert body["next_cursor"] is None
+
+
+def test_history_pages_walk_back_with_cursor(client, user_id, make_persona):
+    persona_id = make_persona(user_id)
+    add_messages(persona_id, 25)
+
+    pages = []
+    params = {"limit": 10}
+    while True:
+        body = client.get(f"/history/{user_id}/{persona_id}", params=params).json()
+        pages.append([m["message"] for m in body["messages"]])
+        if not body["next_cursor"]:
+            break
+        params = {"limit": 10, "cursor": body["next_cursor"]}
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    # Pages come newest first, each one oldest first
+    assert [message for page in reversed(pages) for message in page] == [f"message {i}" for i in range(25)]
+
+
+def test_history_rejects_bad_cursor_and_other_users(client, user_id, make_persona):
+    persona_id = make_persona(user_id)
+
+    assert client.get(f"/history/{user_id}/{persona_id}", params={"cursor": "nope"}).status_code == 400
+    assert client.get(f"/history/{user_id + 1}/{persona_id}").status_code == 404
+
+
+def test_pending_messages_carry_their_enqueue_time(client, user_id, make_persona, write_behind):
+    persona_id = make_persona(user_id)
+    add_messages(persona_id, 2)
+    before = datetime.utcnow().replace(microsecond=0)
+    write_behind.write(persona_id, [("user", "still queued"), ("agent", "me too")])
+
+    body = client.get(f"/history/{user_id}/{persona_id}").json()
+
+    assert [m["message"] for m in body["messages"]] == ["message 0", "message 1", "still queued", "me too"]
+    assert body["message_count"] == 4
+    pending_times = {datetime.fromisoformat(m["created_at"]) for m in body["messages"][2:]}
+    assert len(pending_times) == 1 and pending_times.pop() >= before
+
+    # Once flushed, the rows are saved with the same timestamp
+    write_behind.flush()
+    saved = client.get(f"/history/{user_id}/{persona_id}").json()
+    assert saved["messages"] == body["messages"]
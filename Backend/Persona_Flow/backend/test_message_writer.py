@@ -0,0 +1,75 @@
+import json
+import os
+
+import pytest
+
+from crud_persona import recent_messages
+from database_persona import SessionLocal
+from message_writer import MessageWriter, _save, _wal_line
+
+
+@pytest.fixture
+def writer(tmp_path):
+    writer = MessageWriter(enabled=True, wal_path=str(tmp_path / "persona.wal"), max_attempts=2,
+                           rejected_path=str(tmp_path / "persona.wal.rejected"))
+    yield writer
+    writer.stop()
+
+
+def saved_messages(persona_id: int):
+    with SessionLocal() as db:
+        return [m.message for m in recent_messages(db, persona_id, 100)]
+
+
+def test_failing_row_is_set_aside_without_blocking_the_rest(writer, user_id, make_persona):
+    persona_id = make_persona(user_id)
+    writer.write(persona_id, [("user", "first"), ("agent", None), ("user", "second")])
+
+    writer.flush()
+    assert saved_messages(persona_id) == ["first", "second"]
+    assert [m.message for m in writer.pending_for(persona_id)] == [None]
+
+    writer.write(persona_id, [("user", "third")])
+    writer.flush()
+    assert saved_messages(persona_id) == ["first", "second", "third"]
+    assert writer.pending_for(persona_id) == []
+    assert writer.stats()["rejected"] == 1
+    with open(writer.rejected_path, encoding="utf-8") as f:
+        rejected = [json.loads(line) for line in f]
+    assert [(row["persona_id"], row["message"], row["attempts"]) for row in rejected] == [(persona_id, None, 2)]
+
+
+def test_start_takes_over_wals_of_exited_processes(writer, user_id, make_persona, tmp_path):
+    persona_id = make_persona(user_id)
+    # A WAL left behind by a worker that died before flushing
+    orphan = MessageWriter(enabled=True)
+    orphan.write(persona_id, [("user", "left behind")])
+    orphan_path = f"{writer.wal_path}.999999999"
+    with open(orphan_path, "w", encoding="utf-8") as f:
+        f.writelines(_wal_line(row) for row in orphan._queue)
+
+    writer.start()
+    own_path = f"{writer.wal_path}.{os.getpid()}"
+    assert not os.path.exists(orphan_path)
+    assert os.path.exists(own_path)
+
+    writer.stop()
+    assert saved_messages(persona_id) == ["left behind"]
+    with open(own_path, encoding="utf-8") as f:
+        assert f.read() == ""
+
+
+def test_pending_skips_rows_already_read_from_the_database(writer, user_id, make_persona):
+    persona_id = make_persona(user_id)
+    writer.write(persona_id, [("user", "hello"), ("agent", "hi there")])
+    writer.write(persona_id, [("user", "still queued")])
+    # Catch the writer between its commit and clearing the in-flight batch
+    with writer._cond:
+        writer._inflight, writer._queue = writer._queue[:2], writer._queue[2:]
+    _save(writer._inflight)
+
+    with SessionLocal() as db:
+        saved = recent_messages(db, persona_id, 10)
+    pending = writer.pending_for(persona_id, saved)
+
+    assert [m.message for m in saved + pending] == ["hello", "hi there", "still queued"]
@@ -0,0 +1,118 @@
+"""
+Persona context must never leak between concurrent chats: every prompt the LLM
+sees while answering one persona may only mention that persona.
+"""
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from crewai.llms.base_llm import BaseLLM
+
+import main
+
+PERSONAS = 24
+NAME = re.compile(r"Persona \d{3}")
+SUMMARY = re.compile(r"Profile-\d{3}")
+
+
+def prompt_text(messages) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(
+        m.content if hasattr(m, "content") else str(m.get("content", "")) for m in messages
+    )
+
+
+class RecordingChatLLM:
+    """Stands in for the LangChain chat model used by the fast engine."""
+
+    def __init__(self):
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def stream(self, messages):
+        text = prompt_text(messages)
+        with self._lock:
+            self.prompts.append(text)
+        yield SimpleNamespace(content=f"I am {NAME.search(text).group()}")
+
+
+class RecordingAgentLLM(BaseLLM):
+    """Stands in for the crewai LLM: asks the Character tool once, then answers from its observation."""
+
+    prompts: list = []
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None, **kwargs):
+        text = prompt_text(messages)
+        self.prompts.append(text)
+        character = re.search(r"Character: (Persona \d{3})", text)
+        if not character:
+            return (
+                "Thought: I should look up my character.\n"
+                "Action: Character Information Tool\n"
+                f"Action Input: {json.dumps({'query': 'who am I?'})}"
+            )
+        return f"Thought: I now know the final answer\nFinal Answer: I am {character.group(1)}"
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+
+def assert_single_persona(prompts):
+    assert prompts
+    for text in prompts:
+        assert len(set(NAME.findall(text))) == 1, text
+        assert len(set(SUMMARY.findall(text))) <= 1, text
+        name = NAME.search(text).group()
+        summaries = SUMMARY.findall(text)
+        if summaries:
+            assert summaries[0] == f"Profile-{name[-3:]}", text
+
+
+@pytest.fixture
+def personas(user_id, make_persona):
+    return [
+        make_persona(user_id, name=f"Persona {i:03d}", summary=f"Profile-{i:03d}: speaks only of topic {i}.")
+        for i in range(PERSONAS)
+    ]
+
+
+def chat_concurrently(client, user_id, personas, engine):
+    def chat(i):
+        response = client.post("/chat/", data={
+            "user_id": user_id, "persona_id": personas[i], "user_message": f"Hello number {i}", "engine": engine,
+        })
+        assert response.status_code == 200, response.text
+        return i, response.json()["response"]
+
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        # Two rounds, so the second one also reads history saved by the first
+        return list(pool.map(chat, list(range(PERSONAS)) * 2))
+
+
+def test_concurrent_fast_chats_keep_their_own_persona(client, user_id, personas, monkeypatch):
+    llm = RecordingChatLLM()
+    monkeypatch.setattr(main, "gemini_chat_llm", llm)
+
+    replies = chat_concurrently(client, user_id, personas, "fast")
+
+    assert all(reply == f"I am Persona {i:03d}" for i, reply in replies)
+    assert len(llm.prompts) == 2 * PERSONAS
+    assert_single_persona(llm.prompts)
+
+
+def test_concurrent_agentic_chats_keep_their_own_persona(client, user_id, personas, monkeypatch):
+    llm = RecordingAgentLLM(model="recording")
+    llm.prompts = []
+    monkeypatch.setattr(main, "gemini_llm", llm)
+
+    replies = chat_concurrently(client, user_id, personas, "agentic")
+
+    assert all(reply == f"I am Persona {i:03d}" for i, reply in replies)
+    assert_single_persona(llm.prompts)
+    # Every chat went through the Character tool, whose answer lands in the next prompt
+    assert sum("Character: Persona" in text for text in llm.prompts) >= 2 * PERSONAS
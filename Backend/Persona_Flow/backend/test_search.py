@@ -0,0 +1,56 @@
+import pytest
+
+from crud_persona import delete_personas, save_message_rows
+from database_persona import SessionLocal, engine
+from persona_search import PersonaSearch
+
+
+@pytest.fixture(params=["fts5", "memory"])
+def search(request):
+    search = PersonaSearch(request.param)
+    search.setup(engine)
+    assert search.backend == request.param
+    return search
+
+
+def add_messages(persona_id: int, *messages: str):
+    with SessionLocal() as db:
+        save_message_rows(db, [{"persona_id": persona_id, "sender": "user", "message": m} for m in messages])
+
+
+def found(search, user_id: int, query: str, persona_id=None):
+    with SessionLocal() as db:
+        return sorted(row.message for row in search.search(db, user_id, query, persona_id))
+
+
+def test_search_matches_every_term(search, user_id, make_persona):
+    persona_id = make_persona(user_id)
+    add_messages(persona_id, "The hound of the Baskervilles", "A study in scarlet", "The sign of the four hounds")
+
+    assert found(search, user_id, "hound") == ["The hound of the Baskervilles"]
+    assert found(search, user_id, "the SIGN four") == ["The sign of the four hounds"]
+    assert found(search, user_id, "scarlet hound") == []
+
+
+def test_search_ignores_query_syntax(search, user_id, make_persona):
+    persona_id = make_persona(user_id)
+    add_messages(persona_id, "watson and baker street")
+
+    assert found(search, user_id, 'baker" AND "street*') == ["watson and baker street"]
+    assert found(search, user_id, "!!!") == []
+
+
+def test_search_is_scoped_to_user_persona_and_live_personas(search, user_id, make_persona):
+    mine = make_persona(user_id)
+    other = make_persona(user_id, name="Watson")
+    stranger = make_persona(user_id + 10_000)
+    add_messages(mine, "meet at the museum")
+    add_messages(other, "the museum is closed")
+    add_messages(stranger, "museum tickets")
+
+    assert found(search, user_id, "museum") == ["meet at the museum", "the museum is closed"]
+    assert found(search, user_id, "museum", persona_id=mine) == ["meet at the museum"]
+
+    with SessionLocal() as db:
+        delete_personas(db, user_id, [other], soft=True)
+    assert found(search, user_id, "museum") == ["meet at the museum"]
@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+import summary_jobs
+from database_persona import SessionLocal
+from models_persona import PersonaFlow
+from summary_jobs import SummaryJobQueue
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(summary_jobs, "SUMMARY_SAVE_BACKOFF_S", 0.01)
+
+
+@pytest.fixture
+def pending_persona(user_id, make_persona):
+    persona_id = make_persona(user_id, name=f"Pending {user_id}", summary="")
+    with SessionLocal() as db:
+        db.get(PersonaFlow, persona_id).summary_status = "pending"
+        db.commit()
+    return persona_id
+
+
+def status_when_settled(persona_id: int, timeout: float = 5.0) -> str:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with SessionLocal() as db:
+            status = db.get(PersonaFlow, persona_id).summary_status
+        if status != "pending":
+            return status
+        time.sleep(0.02)
+    return "pending"
+
+
+def test_summary_is_saved_after_a_failed_write(pending_persona, monkeypatch):
+    queue = SummaryJobQueue(lambda name, tone: f"Profile of {name}")
+    update = queue._update
+    calls = []
+
+    def flaky_update(persona_id, values):
+        calls.append(values)
+        if len(calls) == 1:
+            raise RuntimeError("database went away")
+        update(persona_id, values)
+
+    monkeypatch.setattr(queue, "_update", flaky_update)
+    queue.submit(pending_persona, f"Pending {pending_persona}", "calm")
+
+    assert status_when_settled(pending_persona) == "ready"
+    assert len(calls) == 2
+
+
+def test_status_becomes_failed_when_the_summary_cannot_be_saved(pending_persona, monkeypatch):
+    queue = SummaryJobQueue(lambda name, tone: f"Profile of {name}")
+    update = queue._update
+
+    def rejecting_update(persona_id, values):
+        if "summary" in values:
+            raise RuntimeError("summary rejected")
+        update(persona_id, values)
+
+    monkeypatch.setattr(queue, "_update", rejecting_update)
+    queue.submit(pending_persona, f"Pending {pending_persona}", "calm")
+
+    assert status_when_settled(pending_persona) == "failed"
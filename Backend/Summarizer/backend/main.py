@@ -1,3 +1,10 @@
+import sys
+from pathlib import Path
+
+# Make the shared Backend/common package importable when run from this directory
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from common.log import RequestIdMiddleware, configure_logging
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
@@ -19,6 +26,7 @@ load_dotenv()
 GEMINI_KEY = os.getenv("GEMINI_KEY")
 RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
 
+configure_logging("summarizer")
 app = FastAPI(title="AI Summarizer + Blog Writer API", version="2.1")
 
 app.add_middleware(
@@ -28,6 +36,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestIdMiddleware)
 
 llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-lite", google_api_key=GEMINI_KEY)
 crewai_llm = LLM(model="gemini/gemini-2.5-flash-lite", api_key=GEMINI_KEY)
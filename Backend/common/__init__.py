@@ -0,0 +1 @@
+"""Code shared by the NexaGen backend services (logging, database)."""
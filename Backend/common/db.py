@@ -0,0 +1,177 @@
+"""
+Database engines and models shared by the services that use DATABASE_URL_ONLINE.
+
+Pool settings come from the environment, read when an engine is created:
+
+    DB_POOL_SIZE       connections kept open (default 10)
+    DB_MAX_OVERFLOW    extra connections allowed under load (default 20)
+    DB_POOL_TIMEOUT    seconds to wait for a free connection (default 30)
+    DB_POOL_RECYCLE    seconds before a connection is replaced, below MySQL's
+                       wait_timeout (default 1800)
+    DB_POOL_PRE_PING   test connections on checkout (default true)
+
+DATABASE_URL_REPLICA, when set, is a read replica for history reads; reads
+that must see the caller's own writes stay on the primary.
+
+Engines use pools that time every checkout, so pool_stats() can report how
+long requests wait for a connection (including connect time when the pool has
+to open one) next to the checked-out and overflow counts.
+"""
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String, create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Async drivers used for the request path, keyed by the backend of the configured URL
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+Base = declarative_base()
+
+
+class User(Base):
+    __tablename__ = "users"
+    # Ensure MySQL will auto-increment this primary key
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    username = Column(String(100), unique=True, index=True)
+    hashed_password = Column(String(200))
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<User(id={self.id}, username='{self.username}')>"
+
+
+def to_async_url(url: str):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+def replica_url():
+    return os.getenv("DATABASE_URL_REPLICA") or None
+
+
+class PoolMetrics:
+    """Checkout wait times of one pool; percentiles cover the last `window` checkouts."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self._recent.append(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent)
+            p95 = recent[int(0.95 * (len(recent) - 1))] if recent else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(1000 * self.total_wait / self.checkouts, 3) if self.checkouts else 0.0,
+                "p95_wait_ms": round(1000 * p95, 3),
+                "max_wait_ms": round(1000 * self.max_wait, 3),
+            }
+
+
+class _TimedCheckout:
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started)
+        return conn
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() == "true"
+
+
+def pool_options(url, is_async: bool = False) -> dict:
+    options = {"pool_pre_ping": _env_bool("DB_POOL_PRE_PING", "true")}
+    # SQLite (local runs and benchmarks) keeps SQLAlchemy's own pool choice
+    if make_url(url).get_backend_name() == "sqlite":
+        return options
+    options.update(
+        poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    )
+    return options
+
+
+def _enable_sqlite_foreign_keys(dbapi_connection, _record):
+    # SQLite ignores ON DELETE CASCADE unless foreign keys are switched on per connection
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def _with_sqlite_foreign_keys(engine, url):
+    if make_url(url).get_backend_name() == "sqlite":
+        event.listen(getattr(engine, "sync_engine", engine), "connect", _enable_sqlite_foreign_keys)
+    return engine
+
+
+def create_db_engine(url, **kw):
+    return _with_sqlite_foreign_keys(create_engine(url, **{**pool_options(url), **kw}), url)
+
+
+def create_async_db_engine(url, **kw):
+    url = to_async_url(url)
+    return _with_sqlite_foreign_keys(create_async_engine(url, **{**pool_options(url, is_async=True), **kw}), url)
+
+
+def pool_stats(engine) -> dict:
+    """Pool occupancy and checkout wait times of a sync or async engine."""
+    pool = getattr(engine, "sync_engine", engine).pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+        )
+    metrics = getattr(pool, "metrics", None)
+    if metrics:
+        stats.update(metrics.snapshot())
+    return stats
@@ -0,0 +1,156 @@
+"""
+In-process background jobs for course generation.
+
+POST /generate/course/jobs queues a job and returns its id straight away; a
+small worker pool (COURSE_JOB_WORKERS) runs jobs in order, at most
+COURSE_JOB_MAX_PENDING waiting at once. Jobs report per-stage progress, can be
+cancelled (cooperatively, between stages), and finished jobs are forgotten
+COURSE_JOB_RETENTION_S seconds after they end.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from common.log import get_logger
+
+logger = get_logger(__name__)
+
+COURSE_JOB_WORKERS = int(os.getenv("COURSE_JOB_WORKERS", "2"))
+COURSE_JOB_MAX_PENDING = int(os.getenv("COURSE_JOB_MAX_PENDING", "20"))
+COURSE_JOB_RETENTION_S = float(os.getenv("COURSE_JOB_RETENTION_S", "3600"))
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobCancelled(Exception):
+    pass
+
+
+@dataclass
+class CourseJob:
+    id: str
+    course: str
+    pipeline: str
+    status: str = "queued"  # queued -> running -> succeeded | failed | cancelled
+    progress: Dict[str, str] = field(default_factory=dict)  # stage -> running/done/failed/skipped
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+    _finished_mono: Optional[float] = None
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        data = {
+            "job_id": self.id,
+            "course": self.course,
+            "pipeline": self.pipeline,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+# A runner generates the course: runner(job) -> result dict. It should update
+# job.progress and give up early (raising JobCancelled) once job.cancel_event is set.
+Runner = Callable[[CourseJob], dict]
+
+
+class JobStore:
+    def __init__(self, workers: int = COURSE_JOB_WORKERS, max_pending: int = COURSE_JOB_MAX_PENDING,
+                 retention: float = COURSE_JOB_RETENTION_S):
+        self.max_pending = max_pending
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="course-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, CourseJob] = {}
+
+    def submit(self, course: str, pipeline: str, runner: Runner) -> CourseJob:
+        with self._lock:
+            self._expire()
+            if sum(job.status == "queued" for job in self._jobs.values()) >= self.max_pending:
+                raise JobQueueFull()
+            job = CourseJob(id=uuid.uuid4().hex, course=course, pipeline=pipeline)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, runner)
+        return job
+
+    def get(self, job_id: str) -> Optional[CourseJob]:
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[CourseJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and job.status not in FINISHED:
+                job.cancel_event.set()
+                if job.status == "queued":
+                    # Never started; the worker will skip it
+                    self._finish(job, "cancelled")
+        return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
+
+    def shutdown(self):
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: CourseJob, runner: Runner):
+        with self._lock:
+            if job.cancel_event.is_set():
+                return
+            job.status = "running"
+            job.started_at = datetime.now()
+        try:
+            result = runner(job)
+        except JobCancelled:
+            self._finish(job, "cancelled")
+            return
+        except Exception as e:
+            logger.exception("Course job failed", extra={"job_id": job.id, "course": job.course})
+            job.error = str(e)[:500]
+            self._finish(job, "failed")
+            return
+        if job.cancel_event.is_set():
+            self._finish(job, "cancelled")
+            return
+        job.result = result
+        self._finish(job, "succeeded")
+
+    def _finish(self, job: CourseJob, status: str):
+        job.status = status
+        job.finished_at = datetime.now()
+        job._finished_mono = time.monotonic()
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job._finished_mono is not None and job._finished_mono < cutoff]:
+            del self._jobs[job_id]
+
+
+job_store = JobStore()
@@ -1,11 +1,22 @@
+import sys
+from pathlib import Path
+
+# Make the shared Backend/common package importable when run from this directory
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
 import os
 from dotenv import load_dotenv
+from common.log import RequestIdMiddleware, configure_logging, get_logger
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sse_starlette.sse import EventSourceResponse
 from pydantic import BaseModel, Field
 from crewai import LLM, Agent, Task, Crew
 from datetime import datetime
-from typing import Type, Any
-import time
+from typing import Type, Callable, Literal, Optional
+import asyncio
+import json
+import threading
 
 load_dotenv()
 
@@ -24,10 +35,15 @@ if not tavily_key:
 
 os.environ["TAVILY_API_KEY"] = tavily_key
 
-from langchain_community.utilities import WikipediaAPIWrapper
-from langchain_community.tools import WikipediaQueryRun
-from langchain_tavily import TavilySearch
 from crewai.tools import BaseTool
+from research import gather_research, format_research, skill_plan, content_plan, quiz_plan
+from research_cache import research_cache
+from pipeline import COURSE_SECTIONS, PipelineCancelled, run_course_pipeline
+from jobs import CourseJob, JobCancelled, JobQueueFull, job_store
+from prompts import (
+    skills_prompt, content_prompt, quiz_prompt, response_text,
+    SKILLS_MAX_CHARS, CONTENT_MAX_CHARS, QUIZ_MAX_CHARS
+)
 
 
 class CourseInput(BaseModel):
@@ -50,70 +66,11 @@ class AdvancedSkillDiscovery(BaseTool):
             course = course.strip()
             print(f"🔍 Running skill discovery for: {course}")
 
-            search_tool = TavilySearch(topic="general", max_results=5)
-            queries = [
-                f"{course} essential skills 2024 industry requirements",
-                f"{course} career path roadmap certification",
-                f"{course} job market demand salary trends"
-            ]
-
-            results = ""
-            for q in queries:
-                try:
-                    time.sleep(0.5)  # Rate limiting
-                    search_result = search_tool.invoke({'query': q})
-                    results += f"\n=== {q} ===\n{str(search_result)[:800]}\n"
-                except Exception as e:
-                    print(f"Search error for '{q}': {e}")
-                    continue
-
-            analysis_prompt = f"""You are a senior career advisor specializing in {course}.
-Based on this research data, create a detailed skills analysis:
-
-{results}
-
-Structure your analysis:
-
-🎯 SKILL CATEGORIES & BREAKDOWN
-
-1. FOUNDATIONAL SKILLS (Must-Have)
-- Core concepts every beginner needs
-- Basic tools and technologies
-
-2. INTERMEDIATE SKILLS (Career Building)
-- Advanced concepts for job readiness
-- Popular frameworks and tools
+            # All searches run at once; failed or slow ones are left out
+            results = format_research(gather_research(skill_plan(course)))
 
-3. ADVANCED/EXPERT SKILLS (Specialization)
-- Cutting-edge technologies
-- Leadership skills
-
-4. SOFT SKILLS & COMPLEMENTARY ABILITIES
-- Communication and collaboration
-- Project management
-
-📊 MARKET ANALYSIS
-- Current job market demand
-- Salary expectations by skill level
-- Industry growth trends
-
-🏆 CERTIFICATION & LEARNING PATHS
-- Recommended certifications
-- Best learning resources
-- Timeline expectations
-
-🔮 FUTURE TRENDS & EMERGING SKILLS
-- Technologies to watch
-- Future-proofing strategies
-
-Keep response comprehensive but under 3000 words."""
-
-            response = gemini_llm.call(analysis_prompt)
-
-            # Handle different response types
-            if hasattr(response, 'content'):
-                return str(response.content)[:5000]
-            return str(response)[:5000]
+            response = gemini_llm.call(skills_prompt(course, results))
+            return response_text(response, SKILLS_MAX_CHARS)
 
         except Exception as e:
             error_msg = f"Error during skill discovery: {str(e)[:300]}"
@@ -136,44 +93,10 @@ class MultisourceContentCreator(BaseTool):
             course = course.strip()
             print(f"📚 Creating content for: {course}")
 
-            search_tool = TavilySearch(topic="general", max_results=5)
-            data = ""
-
-            for q in [f"{course} tutorial", f"{course} projects", f"{course} advanced guide"]:
-                try:
-                    time.sleep(0.5)
-                    search_result = search_tool.invoke({'query': q})
-                    data += f"\n=== {q} ===\n{str(search_result)[:600]}\n"
-                except Exception as e:
-                    print(f"Search error: {e}")
-                    continue
-
-            try:
-                wiki_api = WikipediaAPIWrapper(top_k_results=2)
-                wiki_tool = WikipediaQueryRun(api_wrapper=wiki_api)
-                wiki = wiki_tool.run(course)
-                data += f"\n=== Wikipedia ===\n{str(wiki)[:800]}\n"
-            except Exception as e:
-                print(f"Wikipedia error: {e}")
-
-            prompt = f"""Create comprehensive educational content for {course}.
+            data = format_research(gather_research(content_plan(course)))
 
-Research data:
-{data}
-
-Include:
-1. Course outline with 6-8 major modules
-2. Key concepts with clear explanations
-3. 4 practical projects (beginner to advanced)
-4. Learning resources and next steps
-
-Keep under 4000 words, practical and actionable."""
-
-            response = gemini_llm.call(prompt)
-
-            if hasattr(response, 'content'):
-                return str(response.content)[:6000]
-            return str(response)[:6000]
+            response = gemini_llm.call(content_prompt(course, data))
+            return response_text(response, CONTENT_MAX_CHARS)
 
         except Exception as e:
             error_msg = f"Error during content creation: {str(e)[:300]}"
@@ -196,38 +119,10 @@ class IntelligentQuizCreator(BaseTool):
             course = course.strip()
             print(f"❓ Creating quiz for: {course}")
 
-            search_tool = TavilySearch(topic="general", max_results=3)
-            data = ""
-
-            for q in [f"{course} interview questions", f"{course} assessment"]:
-                try:
-                    time.sleep(0.5)
-                    search_result = search_tool.invoke({'query': q})
-                    data += f"\n=== {q} ===\n{str(search_result)[:500]}\n"
-                except Exception as e:
-                    print(f"Search error: {e}")
-                    continue
-
-            prompt = f"""Create 30 advanced quiz questions for {course}.
-
-Reference data:
-{data}
-
-Requirements:
-- 10 beginner questions (foundational concepts)
-- 10 intermediate questions (practical application)
-- 10 advanced questions (expert-level scenarios)
-- Multiple choice format (4 options: A, B, C, D)
-- Mark correct answer clearly
-- Provide detailed explanation for each answer
-
-Keep under 4000 words total."""
-
-            response = gemini_llm.call(prompt)
+            data = format_research(gather_research(quiz_plan(course)))
 
-            if hasattr(response, 'content'):
-                return str(response.content)[:6000]
-            return str(response)[:6000]
+            response = gemini_llm.call(quiz_prompt(course, data))
+            return response_text(response, QUIZ_MAX_CHARS)
 
         except Exception as e:
             error_msg = f"Error creating quiz: {str(e)[:300]}"
@@ -530,15 +425,19 @@ validate their readiness for professional roles in {course}.""",
 )
 
 # FastAPI App
+configure_logging("course-gen")
+logger = get_logger(__name__)
 app = FastAPI(
     title="AI Curriculum Generator API",
     description="Generate curriculum, content, and quizzes using Gemini + CrewAI",
     version="2.0"
 )
+app.add_middleware(RequestIdMiddleware)
 
 
 class CourseRequest(BaseModel):
     course: str
+    pipeline: Literal["dag", "crew"] = "dag"  # 'dag' runs independent stages concurrently
 
     class Config:
         title = "CourseRequestModel"
@@ -549,72 +448,122 @@ async def root():
     return {"message": "✅ AI Curriculum Backend is running successfully!"}
 
 
-@app.post("/generate/course")
-async def generate_course(request: CourseRequest):
-    try:
-        print(f"\n{'=' * 60}")
-        print(f"🚀 Starting course generation for: {request.course}")
-        print(f"{'=' * 60}\n")
+@app.get("/research/cache")
+def research_cache_stats():
+    return research_cache.stats()
 
-        crew = Crew(
-            agents=[curriculum_creator_agent, content_writer, quiz_maker],
-            tasks=[skill_research_task, content_task, quiz_task],
-            verbose=True,
-            process="sequential"
-        )
 
-        result = crew.kickoff(inputs={"course": request.course})
-
-        # Initialize response structure
-        response_data = {
-            "course": request.course,
-            "generated_at": datetime.now().isoformat(),
-            "skills_analysis": "",
-            "content": "",
-            "quiz": ""
-        }
-
-        # Extract individual task outputs if available
-        if hasattr(result, "tasks_output") and result.tasks_output:
-            print(f"\n✅ Processing {len(result.tasks_output)} task outputs\n")
-
-            for i, task_output in enumerate(result.tasks_output):
-                output_text = ""
-
-                # Extract text from task output
-                if hasattr(task_output, "raw"):
-                    output_text = task_output.raw
-                elif hasattr(task_output, "output"):
-                    output_text = str(task_output.output)
-                elif hasattr(task_output, "result"):
-                    output_text = str(task_output.result)
-                else:
-                    output_text = str(task_output)
-
-                # Map to appropriate response field
-                if i == 0:  # skill_research_task
-                    response_data["skills_analysis"] = output_text
-                    print(f"✓ Skills Analysis: {len(output_text)} characters")
-                elif i == 1:  # content_task
-                    response_data["content"] = output_text
-                    print(f"✓ Content: {len(output_text)} characters")
-                elif i == 2:  # quiz_task
-                    response_data["quiz"] = output_text
-                    print(f"✓ Quiz: {len(output_text)} characters")
-        else:
-            # Fallback: return single output
-            if hasattr(result, "raw"):
-                response_data["content"] = result.raw
-            elif hasattr(result, "output"):
-                response_data["content"] = str(result.output)
+def run_crew(course: str, on_stage: Optional[Callable[[str, str], None]] = None) -> dict:
+    """The original sequential CrewAI flow: skills -> content -> quiz."""
+    finished = []
+
+    def task_done(_output):
+        # Tasks complete in order, so the n-th callback is the n-th section
+        if on_stage and len(finished) < len(COURSE_SECTIONS):
+            finished.append(COURSE_SECTIONS[len(finished)])
+            on_stage(finished[-1], "done")
+
+    crew = Crew(
+        agents=[curriculum_creator_agent, content_writer, quiz_maker],
+        tasks=[skill_research_task, content_task, quiz_task],
+        verbose=True,
+        process="sequential",
+        task_callback=task_done
+    )
+
+    result = crew.kickoff(inputs={"course": course})
+
+    sections = {
+        "skills_analysis": "",
+        "content": "",
+        "quiz": ""
+    }
+
+    # Extract individual task outputs if available
+    if hasattr(result, "tasks_output") and result.tasks_output:
+        print(f"\n✅ Processing {len(result.tasks_output)} task outputs\n")
+
+        for i, task_output in enumerate(result.tasks_output):
+            output_text = ""
+
+            # Extract text from task output
+            if hasattr(task_output, "raw"):
+                output_text = task_output.raw
+            elif hasattr(task_output, "output"):
+                output_text = str(task_output.output)
+            elif hasattr(task_output, "result"):
+                output_text = str(task_output.result)
             else:
-                response_data["content"] = str(result)
+                output_text = str(task_output)
+
+            # Map to appropriate response field
+            if i == 0:  # skill_research_task
+                sections["skills_analysis"] = output_text
+            elif i == 1:  # content_task
+                sections["content"] = output_text
+            elif i == 2:  # quiz_task
+                sections["quiz"] = output_text
+    else:
+        # Fallback: return single output
+        if hasattr(result, "raw"):
+            sections["content"] = result.raw
+        elif hasattr(result, "output"):
+            sections["content"] = str(result.output)
+        else:
+            sections["content"] = str(result)
 
-        print(f"\n{'=' * 60}")
-        print("✅ Course generation completed successfully!")
-        print(f"{'=' * 60}\n")
+    return sections
 
-        return response_data
+
+def build_course(course: str, pipeline: str, on_stage=None, cancel: Optional[threading.Event] = None,
+                 on_section=None, on_chunk=None) -> dict:
+    """
+    Generate a course with the chosen pipeline (blocking) and build the response body.
+    The section and chunk hooks are only supported by the DAG pipeline.
+    """
+    logger.info("Course generation started", extra={"course": course, "pipeline": pipeline})
+
+    if pipeline == "dag":
+        sections = run_course_pipeline(
+            course, gemini_llm, on_stage=on_stage, cancel=cancel, on_section=on_section, on_chunk=on_chunk
+        )
+        for stage, timing in sections["timings"].items():
+            logger.info("Course stage timing", extra={"course": course, "stage": stage, **timing})
+    else:
+        sections = run_crew(course, on_stage=on_stage)
+
+    response_data = {
+        "course": course,
+        "generated_at": datetime.now().isoformat(),
+        "pipeline": pipeline,
+        **sections
+    }
+    logger.info("Course generation completed", extra={
+        "course": course,
+        "pipeline": pipeline,
+        "skills_chars": len(response_data["skills_analysis"]),
+        "content_chars": len(response_data["content"]),
+        "quiz_chars": len(response_data["quiz"]),
+    })
+
+    return response_data
+
+
+def run_course_job(job: CourseJob) -> dict:
+    def on_stage(stage: str, status: str):
+        job.progress[stage] = status
+
+    try:
+        return build_course(job.course, job.pipeline, on_stage=on_stage, cancel=job.cancel_event)
+    except PipelineCancelled:
+        raise JobCancelled()
+
+
+@app.post("/generate/course")
+async def generate_course(request: CourseRequest):
+    try:
+        # Generation blocks for minutes; keep it off the event loop
+        return await run_in_threadpool(build_course, request.course, request.pipeline)
 
     except Exception as e:
         import traceback
@@ -631,6 +580,91 @@ async def generate_course(request: CourseRequest):
         )
 
 
+@app.post("/generate/course/stream")
+async def generate_course_stream(request: CourseRequest):
+    """
+    Server-sent events variant of /generate/course (DAG pipeline only). Emits a
+    `stage` event per stage transition, `chunk` events with each content module
+    and quiz question as the LLM writes it, a `skills_analysis` / `content` /
+    `quiz` event as soon as that section is finished, and a final `done` event.
+    """
+    if request.pipeline != "dag":
+        raise HTTPException(status_code=400, detail="Streaming is only supported by the dag pipeline")
+
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    cancel = threading.Event()
+
+    def emit(event: str, data: dict):
+        # Called from the pipeline's worker threads
+        loop.call_soon_threadsafe(events.put_nowait, {"event": event, "data": json.dumps(data)})
+
+    def generate() -> dict:
+        try:
+            return build_course(
+                request.course, "dag", cancel=cancel,
+                on_stage=lambda stage, status: emit("stage", {"stage": stage, "status": status}),
+                on_section=lambda section, text: emit(section, {"section": section, "text": text}),
+                on_chunk=lambda section, index, text: emit("chunk", {"section": section, "index": index, "text": text}),
+            )
+        finally:
+            loop.call_soon_threadsafe(events.put_nowait, None)
+
+    async def event_stream():
+        generation = asyncio.ensure_future(run_in_threadpool(generate))
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+            response_data = await generation
+            yield {"event": "done", "data": json.dumps(response_data)}
+        except PipelineCancelled:
+            pass
+        except Exception as e:
+            logger.exception("Course stream failed", extra={"course": request.course})
+            yield {"event": "error", "data": json.dumps({"detail": f"Course generation failed: {str(e)[:500]}"})}
+        finally:
+            # Client went away (or we are done): stop starting new stages and streaming tokens
+            cancel.set()
+
+    return EventSourceResponse(event_stream())
+
+
+@app.post("/generate/course/jobs", status_code=202)
+async def create_course_job(request: CourseRequest):
+    """Queue a course generation job; poll GET /generate/course/jobs/{job_id} for the result."""
+    try:
+        job = job_store.submit(request.course, request.pipeline, run_course_job)
+    except JobQueueFull:
+        raise HTTPException(status_code=429, detail="Too many course jobs queued, try again later")
+    return job.to_dict(include_result=False)
+
+
+@app.get("/generate/course/jobs/{job_id}")
+async def get_course_job(job_id: str):
+    job = job_store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job.to_dict()
+
+
+@app.delete("/generate/course/jobs/{job_id}")
+async def cancel_course_job(job_id: str):
+    job = job_store.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job.to_dict(include_result=False)
+
+
+@app.get("/generate/course/jobs")
+async def course_job_stats():
+    return job_store.stats()
+
+
+@app.on_event("shutdown")
+def stop_course_jobs():
+    job_store.shutdown()
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,191 @@
+"""
+DAG-scheduled course generation.
+
+The CrewAI flow runs skills -> content -> quiz one after another, and each tool
+re-does its own research from the course name anyway. Here every stage declares
+only what it really needs: the three research stages start together, and each
+LLM stage starts the moment its own research is in, so the course takes about
+as long as its slowest research + generation chain instead of the sum of all.
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from common.log import get_logger
+from research import gather_research, format_research, skill_plan, content_plan, quiz_plan
+from streaming import MODULE_PATTERN, QUESTION_PATTERN, SectionChunker, stream_generate, stream_llm
+from prompts import (
+    skills_prompt, content_prompt, quiz_prompt, response_text,
+    SKILLS_MAX_CHARS, CONTENT_MAX_CHARS, QUIZ_MAX_CHARS
+)
+
+logger = get_logger(__name__)
+
+COURSE_SECTIONS = ("skills_analysis", "content", "quiz")
+CANCEL_POLL_S = 0.5
+
+StageCallback = Callable[[str, str], None]  # (stage name, 'running' | 'done' | 'failed' | 'skipped')
+SectionCallback = Callable[[str, str], None]  # (section, full text)
+ChunkCallback = Callable[[str, int, str], None]  # (section, chunk index, chunk text)
+
+
+class PipelineCancelled(Exception):
+    pass
+
+
+@dataclass
+class Stage:
+    name: str
+    run: Callable[[Dict[str, Any]], Any]  # called with the outputs of `deps`
+    deps: Tuple[str, ...] = ()
+
+
+class DagScheduler:
+    """
+    Runs stages on a thread pool as soon as all their dependencies have finished.
+    A failed stage skips everything downstream of it; the rest keep going.
+
+    `on_stage` is told about every stage transition. Setting `cancel` makes the
+    run raise PipelineCancelled promptly; no further stages are started.
+    """
+
+    def __init__(self, stages: List[Stage], max_workers: int = 6,
+                 on_stage: Optional[StageCallback] = None, cancel: Optional[threading.Event] = None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.max_workers = max_workers
+        self.on_stage = on_stage or (lambda name, status: None)
+        self.cancel = cancel or threading.Event()
+        for stage in stages:
+            missing = [dep for dep in stage.deps if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stages {missing}")
+
+    def run(self) -> Tuple[Dict[str, Any], Dict[str, str], Dict[str, dict]]:
+        """Returns (outputs, errors, timings), keyed by stage name."""
+        outputs: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        timings: Dict[str, dict] = {}
+        pending = dict(self.stages)
+        running = {}
+        started = time.perf_counter()
+
+        def timed(stage: Stage, inputs: Dict[str, Any]):
+            stage_started = time.perf_counter()
+            self.on_stage(stage.name, "running")
+            try:
+                return stage.run(inputs)
+            finally:
+                timings[stage.name] = {
+                    "started_s": round(stage_started - started, 3),
+                    "duration_s": round(time.perf_counter() - stage_started, 3),
+                }
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="course-stage")
+        try:
+            while pending or running:
+                if self.cancel.is_set():
+                    raise PipelineCancelled()
+                progressed = False
+                for name, stage in list(pending.items()):
+                    if any(dep in errors for dep in stage.deps):
+                        errors[name] = "skipped: upstream stage failed"
+                        self.on_stage(name, "skipped")
+                    elif all(dep in outputs for dep in stage.deps):
+                        inputs = {dep: outputs[dep] for dep in stage.deps}
+                        running[pool.submit(timed, stage, inputs)] = name
+                    else:
+                        continue
+                    del pending[name]
+                    progressed = True
+
+                if not running:
+                    if pending and not progressed:
+                        raise ValueError(f"Dependency cycle between stages {sorted(pending)}")
+                    continue
+                # Wake up periodically to notice cancellation while long stages run
+                done, _ = wait(running, timeout=CANCEL_POLL_S, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        outputs[name] = future.result()
+                        self.on_stage(name, "done")
+                    except Exception as e:
+                        logger.exception("Course stage failed", extra={"stage": name})
+                        errors[name] = str(e)[:300]
+                        self.on_stage(name, "failed")
+        finally:
+            # On cancellation, stages already running finish in the background and are discarded
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        return outputs, errors, timings
+
+
+def generate(llm, prompt: str, max_chars: int) -> str:
+    return response_text(llm.call(prompt), max_chars)
+
+
+def course_stages(course: str, llm, on_section: Optional[SectionCallback] = None,
+                  on_chunk: Optional[ChunkCallback] = None, cancel: Optional[threading.Event] = None) -> List[Stage]:
+    """
+    With `on_chunk`, content and quiz are streamed from the LLM and reported a
+    module / question at a time; `on_section` gets every section once it is done.
+    """
+    stream = stream_llm(llm) if on_chunk else None
+
+    def section(name: str, prompt: Callable[[Dict[str, Any]], str], max_chars: int, pattern=None):
+        def run(inputs: Dict[str, Any]) -> str:
+            if stream and pattern is not None:
+                text = stream_generate(
+                    stream, prompt(inputs), max_chars, SectionChunker(pattern),
+                    lambda index, chunk: on_chunk(name, index, chunk), cancel
+                )
+            else:
+                text = generate(llm, prompt(inputs), max_chars)
+            if on_section:
+                on_section(name, text)
+            return text
+        return run
+
+    return [
+        Stage("research_skills", lambda _: format_research(gather_research(skill_plan(course)))),
+        Stage("research_content", lambda _: format_research(gather_research(content_plan(course)))),
+        Stage("research_quiz", lambda _: format_research(gather_research(quiz_plan(course)))),
+        Stage(
+            "skills_analysis",
+            section("skills_analysis", lambda inputs: skills_prompt(course, inputs["research_skills"]),
+                    SKILLS_MAX_CHARS),
+            deps=("research_skills",),
+        ),
+        Stage(
+            "content",
+            section("content", lambda inputs: content_prompt(course, inputs["research_content"]),
+                    CONTENT_MAX_CHARS, MODULE_PATTERN),
+            deps=("research_content",),
+        ),
+        Stage(
+            "quiz",
+            section("quiz", lambda inputs: quiz_prompt(course, inputs["research_quiz"]),
+                    QUIZ_MAX_CHARS, QUESTION_PATTERN),
+            deps=("research_quiz",),
+        ),
+    ]
+
+
+def run_course_pipeline(course: str, llm, on_stage: Optional[StageCallback] = None,
+                        cancel: Optional[threading.Event] = None, on_section: Optional[SectionCallback] = None,
+                        on_chunk: Optional[ChunkCallback] = None) -> dict:
+    """Generate all course sections; failed sections are empty and listed under `errors`."""
+    started = time.perf_counter()
+    cancel = cancel or threading.Event()
+    stages = course_stages(course.strip(), llm, on_section=on_section, on_chunk=on_chunk, cancel=cancel)
+    scheduler = DagScheduler(stages, on_stage=on_stage, cancel=cancel)
+    outputs, errors, timings = scheduler.run()
+    result = {section: outputs.get(section, "") for section in COURSE_SECTIONS}
+    result.update(
+        errors=errors,
+        timings=timings,
+        total_s=round(time.perf_counter() - started, 3),
+    )
+    return result
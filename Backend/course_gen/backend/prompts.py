@@ -0,0 +1,91 @@
+"""
+Prompt builders and response handling for the course stages, shared by the
+CrewAI tools and the DAG pipeline.
+"""
+
+SKILLS_MAX_CHARS = 5000
+CONTENT_MAX_CHARS = 6000
+QUIZ_MAX_CHARS = 6000
+
+
+def skills_prompt(course: str, results: str) -> str:
+    return f"""You are a senior career advisor specializing in {course}.
+Based on this research data, create a detailed skills analysis:
+
+{results}
+
+Structure your analysis:
+
+🎯 SKILL CATEGORIES & BREAKDOWN
+
+1. FOUNDATIONAL SKILLS (Must-Have)
+- Core concepts every beginner needs
+- Basic tools and technologies
+
+2. INTERMEDIATE SKILLS (Career Building)
+- Advanced concepts for job readiness
+- Popular frameworks and tools
+
+3. ADVANCED/EXPERT SKILLS (Specialization)
+- Cutting-edge technologies
+- Leadership skills
+
+4. SOFT SKILLS & COMPLEMENTARY ABILITIES
+- Communication and collaboration
+- Project management
+
+📊 MARKET ANALYSIS
+- Current job market demand
+- Salary expectations by skill level
+- Industry growth trends
+
+🏆 CERTIFICATION & LEARNING PATHS
+- Recommended certifications
+- Best learning resources
+- Timeline expectations
+
+🔮 FUTURE TRENDS & EMERGING SKILLS
+- Technologies to watch
+- Future-proofing strategies
+
+Keep response comprehensive but under 3000 words."""
+
+
+def content_prompt(course: str, data: str) -> str:
+    return f"""Create comprehensive educational content for {course}.
+
+Research data:
+{data}
+
+Include:
+1. Course outline with 6-8 major modules, each starting on its own line as "Module N: <title>"
+2. Key concepts with clear explanations
+3. 4 practical projects (beginner to advanced)
+4. Learning resources and next steps
+
+Keep under 4000 words, practical and actionable."""
+
+
+def quiz_prompt(course: str, data: str) -> str:
+    return f"""Create 30 advanced quiz questions for {course}.
+
+Reference data:
+{data}
+
+Requirements:
+- 10 beginner questions (foundational concepts)
+- 10 intermediate questions (practical application)
+- 10 advanced questions (expert-level scenarios)
+- Start each question on its own line as "Question N:" (numbered 1-30)
+- Multiple choice format (4 options: A, B, C, D)
+- Mark correct answer clearly
+- Provide detailed explanation for each answer
+
+Keep under 4000 words total."""
+
+
+def response_text(response, max_chars: int) -> str:
+    # Handle different response types
+    if hasattr(response, 'content'):
+        return str(response.content)[:max_chars]
+    return str(response)[:max_chars]
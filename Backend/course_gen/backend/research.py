@@ -0,0 +1,185 @@
+"""
+Concurrent web research for the course tools.
+
+Each tool describes its lookups as a list of ResearchQuery (a "plan") and
+gather_research() runs the whole plan at once on a shared thread pool. A token
+bucket per source replaces the old fixed sleep between Tavily calls, every
+query has a deadline, and failed or late queries are simply left out of the
+research text so one slow search never sinks a course.
+
+Results are read through research_cache first. RESEARCH_BACKEND=stub answers
+every query with canned text, for running the service offline; stub answers are
+cached apart from live ones.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from common.log import get_logger
+from research_cache import research_cache
+
+logger = get_logger(__name__)
+
+RESEARCH_BACKEND = os.getenv("RESEARCH_BACKEND", "live")  # 'live' or 'stub'
+RESEARCH_WORKERS = int(os.getenv("RESEARCH_WORKERS", "12"))  # a whole course plan is 9 queries
+RESEARCH_TIMEOUT_S = float(os.getenv("RESEARCH_TIMEOUT_S", "20"))
+TAVILY_RATE_PER_S = float(os.getenv("TAVILY_RATE_PER_S", "4"))
+TAVILY_BURST = int(os.getenv("TAVILY_BURST", "4"))
+WIKIPEDIA_RATE_PER_S = float(os.getenv("WIKIPEDIA_RATE_PER_S", "2"))
+
+
+@dataclass(frozen=True)
+class ResearchQuery:
+    source: str  # 'tavily' or 'wikipedia'
+    text: str
+    max_results: int = 5
+    max_chars: int = 800
+
+    @property
+    def label(self) -> str:
+        return "Wikipedia" if self.source == "wikipedia" else self.text
+
+
+@dataclass
+class ResearchResult:
+    query: ResearchQuery
+    text: str = ""
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, at most `burst` saved up."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Take a token, sleeping until one is available; False if `deadline` (monotonic) passes first."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                delay = (1 - self._tokens) / self.rate
+            if deadline is not None and now + delay > deadline:
+                return False
+            time.sleep(delay)
+
+
+# ================= PLANS =================
+def skill_plan(course: str) -> List[ResearchQuery]:
+    return [
+        ResearchQuery("tavily", f"{course} essential skills 2024 industry requirements"),
+        ResearchQuery("tavily", f"{course} career path roadmap certification"),
+        ResearchQuery("tavily", f"{course} job market demand salary trends"),
+    ]
+
+
+def content_plan(course: str) -> List[ResearchQuery]:
+    return [
+        ResearchQuery("tavily", f"{course} tutorial", max_chars=600),
+        ResearchQuery("tavily", f"{course} projects", max_chars=600),
+        ResearchQuery("tavily", f"{course} advanced guide", max_chars=600),
+        ResearchQuery("wikipedia", course, max_results=2),
+    ]
+
+
+def quiz_plan(course: str) -> List[ResearchQuery]:
+    return [
+        ResearchQuery("tavily", f"{course} interview questions", max_results=3, max_chars=500),
+        ResearchQuery("tavily", f"{course} assessment", max_results=3, max_chars=500),
+    ]
+
+
+# ================= BACKEND =================
+def search_tavily(query: ResearchQuery) -> str:
+    from langchain_tavily import TavilySearch
+
+    return str(TavilySearch(topic="general", max_results=query.max_results).invoke({"query": query.text}))
+
+
+def search_wikipedia(query: ResearchQuery) -> str:
+    from langchain_community.utilities import WikipediaAPIWrapper
+    from langchain_community.tools import WikipediaQueryRun
+
+    return str(WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper(top_k_results=query.max_results)).run(query.text))
+
+
+def search_stub(query: ResearchQuery) -> str:
+    return "\n".join(
+        f"[stub {query.source} result {i + 1}] {query.text}: overview, key concepts and examples."
+        for i in range(query.max_results)
+    )
+
+
+SEARCHERS = {
+    "tavily": search_tavily,
+    "wikipedia": search_wikipedia,
+}
+
+_buckets: Dict[str, TokenBucket] = {
+    "tavily": TokenBucket(TAVILY_RATE_PER_S, TAVILY_BURST),
+    "wikipedia": TokenBucket(WIKIPEDIA_RATE_PER_S, 1),
+}
+_executor = ThreadPoolExecutor(max_workers=RESEARCH_WORKERS, thread_name_prefix="research")
+
+
+def run_query(query: ResearchQuery, deadline: float) -> ResearchResult:
+    started = time.perf_counter()
+    backend = RESEARCH_BACKEND
+    cached = research_cache.get(query.source, query.text, query.max_results, backend)
+    if cached is not None:
+        return ResearchResult(query, text=cached[:query.max_chars], elapsed=time.perf_counter() - started, cached=True)
+
+    stub = backend == "stub"
+    bucket = None if stub else _buckets.get(query.source)
+    if bucket and not bucket.acquire(deadline):
+        return ResearchResult(query, error="rate limited past deadline")
+    try:
+        text = search_stub(query) if stub else SEARCHERS[query.source](query)
+        research_cache.put(query.source, query.text, query.max_results, text, backend)
+        return ResearchResult(query, text=text[:query.max_chars], elapsed=time.perf_counter() - started)
+    except Exception as e:
+        logger.warning("Research query failed", extra={"query": query.text, "source": query.source, "error": str(e)})
+        return ResearchResult(query, error=str(e)[:300], elapsed=time.perf_counter() - started)
+
+
+def gather_research(queries: List[ResearchQuery], timeout: float = RESEARCH_TIMEOUT_S) -> List[ResearchResult]:
+    """
+    Run every query concurrently and return one result per query, in plan order.
+    Queries still running at the deadline come back as timed out; their threads
+    finish in the background and the answers are dropped.
+    """
+    deadline = time.monotonic() + timeout
+    futures = [_executor.submit(run_query, query, deadline) for query in queries]
+    wait(futures, timeout=timeout)
+
+    results = []
+    for query, future in zip(queries, futures):
+        if future.done():
+            results.append(future.result())
+        else:
+            logger.warning("Research query timed out", extra={"query": query.text, "source": query.source})
+            results.append(ResearchResult(query, error=f"timed out after {timeout:.0f}s"))
+    return results
+
+
+def format_research(results: List[ResearchResult]) -> str:
+    """Research text for a prompt: one section per successful query."""
+    return "".join(f"\n=== {r.query.label} ===\n{r.text}\n" for r in results if r.ok)
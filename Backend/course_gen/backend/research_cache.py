@@ -0,0 +1,139 @@
+"""
+Disk-backed cache of research lookups, so repeated courses skip the network.
+
+Entries live in a local SQLite file keyed on (backend, source, max_results,
+normalized query text) and expire after RESEARCH_CACHE_TTL_S. Once the stored text passes
+RESEARCH_CACHE_MAX_MB the least recently read entries are evicted. Set
+RESEARCH_CACHE_PATH to an empty string to disable the cache.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from common.log import get_logger
+
+logger = get_logger(__name__)
+
+RESEARCH_CACHE_PATH = os.getenv("RESEARCH_CACHE_PATH", "research_cache.db")
+RESEARCH_CACHE_TTL_S = float(os.getenv("RESEARCH_CACHE_TTL_S", str(7 * 24 * 3600)))
+RESEARCH_CACHE_MAX_MB = float(os.getenv("RESEARCH_CACHE_MAX_MB", "50"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS research_cache (
+    key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    query TEXT NOT NULL,
+    text TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_research_cache_accessed ON research_cache (accessed_at);
+"""
+
+
+def cache_key(source: str, text: str, max_results: int, backend: str = "live") -> str:
+    # The backend is part of the key so canned stub results are never served to live lookups
+    return f"{backend}|{source}|{max_results}|{' '.join(text.lower().split())}"
+
+
+class ResearchCache:
+    def __init__(self, path: str = RESEARCH_CACHE_PATH, ttl: float = RESEARCH_CACHE_TTL_S,
+                 max_mb: float = RESEARCH_CACHE_MAX_MB):
+        self.enabled = bool(path)
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def _db(self) -> sqlite3.Connection:
+        # Opened on first use so importing the module never touches the disk
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.execute("DELETE FROM research_cache WHERE created_at < ?", (time.time() - self.ttl,))
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM research_cache").fetchone()[0]
+            logger.info("Research cache opened", extra={"path": self.path, "bytes": self._bytes})
+        return self._conn
+
+    def get(self, source: str, text: str, max_results: int, backend: str = "live") -> Optional[str]:
+        if not self.enabled:
+            return None
+        key = cache_key(source, text, max_results, backend)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT text, size, created_at FROM research_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            cached, size, created_at = row
+            if now - created_at > self.ttl:
+                db.execute("DELETE FROM research_cache WHERE key = ?", (key,))
+                self._bytes -= size
+                self.expired += 1
+                self.misses += 1
+                return None
+            db.execute("UPDATE research_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return cached
+
+    def put(self, source: str, text: str, max_results: int, result: str, backend: str = "live"):
+        if not self.enabled:
+            return
+        key = cache_key(source, text, max_results, backend)
+        size = len(result.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            old = db.execute("SELECT size FROM research_cache WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO research_cache (key, source, query, text, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, source, text, result, size, now, now),
+            )
+            self._bytes += size - (old[0] if old else 0)
+            self._evict(db)
+
+    def _evict(self, db: sqlite3.Connection):
+        while self._bytes > self.max_bytes:
+            rows = db.execute(
+                "SELECT key, size FROM research_cache ORDER BY accessed_at LIMIT 50"
+            ).fetchall()
+            if not rows:
+                self._bytes = 0
+                return
+            for key, size in rows:
+                db.execute("DELETE FROM research_cache WHERE key = ?", (key,))
+                self._bytes -= size
+                self.evictions += 1
+                if self._bytes <= self.max_bytes:
+                    return
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db().execute("SELECT COUNT(*) FROM research_cache").fetchone()[0] if self.enabled else 0
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+            }
+
+
+research_cache = ResearchCache()
@@ -0,0 +1,90 @@
+"""
+Token streaming for the course stages.
+
+stream_llm() streams a completion from the same model the crew uses, and
+SectionChunker cuts the running text into whole modules (content) or questions
+(quiz) so /generate/course/stream can send each one the moment it is written.
+"""
+import re
+import threading
+from typing import Callable, Iterator, List, Optional, Pattern
+
+# A line that opens a new module / question, allowing for markdown decoration. These
+# match the "Module N:" / "Question N:" headings the prompts ask for; plain numbered
+# lines are left alone since options, steps and explanations use them too.
+MODULE_PATTERN = re.compile(r"^[ \t>#*_-]*(?:module|week|unit)\s+\d+", re.IGNORECASE | re.MULTILINE)
+QUESTION_PATTERN = re.compile(r"^[ \t>#*_-]*(?:q|question)\s*\d+\b", re.IGNORECASE | re.MULTILINE)
+
+TokenStream = Callable[[str], Iterator[str]]  # prompt -> text deltas
+
+
+def stream_llm(llm) -> TokenStream:
+    """Stream completions for a crewai LLM's model through litellm, which crewai itself calls."""
+    import litellm
+
+    def stream(prompt: str) -> Iterator[str]:
+        response = litellm.completion(
+            model=llm.model,
+            api_key=llm.api_key,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+        )
+        for part in response:
+            text = part.choices[0].delta.content
+            if text:
+                yield text
+
+    return stream
+
+
+class SectionChunker:
+    """
+    Buffers streamed text and hands back each chunk once the next one starts.
+    Only complete lines are matched, so a header split across tokens is never missed.
+    """
+
+    def __init__(self, pattern: Pattern):
+        self.pattern = pattern
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        complete = self._buffer[:self._buffer.rfind("\n") + 1]
+        chunks = []
+        last = 0
+        for match in self.pattern.finditer(complete):
+            if match.start() > last:
+                chunks.append(self._buffer[last:match.start()])
+                last = match.start()
+        self._buffer = self._buffer[last:]
+        return [chunk for chunk in chunks if chunk.strip()]
+
+    def flush(self) -> List[str]:
+        rest, self._buffer = self._buffer, ""
+        return [rest] if rest.strip() else []
+
+
+def stream_generate(stream: TokenStream, prompt: str, max_chars: int, chunker: SectionChunker,
+                    on_chunk: Callable[[int, str], None], cancel: Optional[threading.Event] = None) -> str:
+    """Generate like pipeline.generate(), calling on_chunk(index, text) for every chunk as it completes."""
+    parts = []
+    size = 0
+    index = 0
+
+    def emit(chunks: List[str]):
+        nonlocal index
+        for chunk in chunks:
+            on_chunk(index, chunk)
+            index += 1
+
+    for token in stream(prompt):
+        if cancel is not None and cancel.is_set():
+            break
+        token = token[:max_chars - size]
+        parts.append(token)
+        size += len(token)
+        emit(chunker.feed(token))
+        if size >= max_chars:
+            break
+    emit(chunker.flush())
+    return "".join(parts)
@@ -0,0 +1,38 @@
+import sys
+import time
+from pathlib import Path
+
+# Make the shared Backend/common package importable when run from this directory
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import pytest
+
+import research
+from research import ResearchQuery, run_query
+from research_cache import ResearchCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ResearchCache(path=str(tmp_path / "research_cache.db"))
+    monkeypatch.setattr(research, "research_cache", cache)
+    return cache
+
+
+def test_stub_results_are_not_served_to_live_lookups(cache, monkeypatch):
+    query = ResearchQuery("tavily", "python tutorial")
+    monkeypatch.setitem(research.SEARCHERS, "tavily", lambda q: "live result")
+    deadline = time.monotonic() + 5
+
+    monkeypatch.setattr(research, "RESEARCH_BACKEND", "stub")
+    stub = run_query(query, deadline)
+    assert stub.text.startswith("[stub tavily result 1]")
+    assert run_query(query, deadline).cached
+
+    monkeypatch.setattr(research, "RESEARCH_BACKEND", "live")
+    live = run_query(query, deadline)
+    assert not live.cached
+    assert live.text == "live result"
+    again = run_query(query, deadline)
+    assert again.cached
+    assert again.text == "live result"
@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+# Make the shared Backend/common package importable when run from this directory
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from streaming import MODULE_PATTERN, QUESTION_PATTERN, SectionChunker, stream_generate
+
+QUIZ = """## Beginner Questions
+**Question 1:** Which keyword defines a function?
+A) func
+B) def
+1. note: options are case sensitive
+Correct answer: B
+Explanation:
+1. `def` starts a function definition.
+2. `func` is not a Python keyword.
+Q2. What does len() return?
+A) The size
+Correct answer: A
+"""
+
+
+def chunks_of(text, pattern, token_size=4):
+    chunker = SectionChunker(pattern)
+    chunks = []
+    for i in range(0, len(text), token_size):
+        chunks.extend(chunker.feed(text[i:i + token_size]))
+    return chunks + chunker.flush()
+
+
+def test_numbered_lines_inside_a_question_stay_in_it():
+    chunks = chunks_of(QUIZ, QUESTION_PATTERN)
+    assert len(chunks) == 3
+    assert chunks[0] == "## Beginner Questions\n"
+    assert chunks[1].startswith("**Question 1:**")
+    assert "1. note: options are case sensitive" in chunks[1]
+    assert "2. `func` is not a Python keyword." in chunks[1]
+    assert chunks[2].startswith("Q2.")
+    assert "".join(chunks) == QUIZ
+
+
+def test_module_chunks():
+    content = "Intro\n## Module 1: Basics\n1. Install Python\n**Module 2:** Data\nLists"
+    assert chunks_of(content, MODULE_PATTERN) == [
+        "Intro\n", "## Module 1: Basics\n1. Install Python\n", "**Module 2:** Data\nLists"
+    ]
+
+
+def test_stream_generate_truncates_and_reports_chunk_indexes():
+    emitted = []
+    text = stream_generate(
+        lambda prompt: iter(["Question 1: a\n", "Question 2: b\n", "Question 3: c\n"]),
+        "prompt", 30, SectionChunker(QUESTION_PATTERN), lambda index, chunk: emitted.append((index, chunk))
+    )
+    assert text == "Question 1: a\nQuestion 2: b\nQu"
+    assert emitted == [(0, "Question 1: a\n"), (1, "Question 2: b\nQu")]
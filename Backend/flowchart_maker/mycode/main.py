@@ -1,3 +1,10 @@
+import sys
+from pathlib import Path
+
+# Make the shared Backend/common package importable when run from this directory
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from common.log import RequestIdMiddleware, configure_logging
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import HTMLResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -11,6 +18,7 @@ from pyflowchart import Flowchart, output_html
 
 from llm import gemini_llm
 
+configure_logging("flowchart-maker")
 app = FastAPI(
     title="Flowchart Generator API",
     description="Generate flowcharts from natural language queries using AI",
@@ -24,6 +32,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestIdMiddleware)
 
 class FlowchartRequest(BaseModel):
     query: str